@@ -3,19 +3,65 @@ Configuration settings for BrandGen application
 """
 
 import os
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# .env in the project root; setup.py compiles it to config/env_cache.py
+_DOTENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")
+
+# Environment snapshot, populated once per process
+_env_loaded = False
+_ENV: Dict[str, str] = {}
+# Variables .env added to os.environ, as opposed to ones the process environment set
+_DOTENV_KEYS: FrozenSet[str] = frozenset()
+
+def _load_env_cache() -> Optional[Dict[str, str]]:
+    """Return the compiled .env values if config/env_cache.py is still current"""
+    try:
+        from config.env_cache import ENV, ENV_MTIME
+    except ImportError:
+        return None
+    
+    try:
+        if os.path.getmtime(_DOTENV_PATH) != ENV_MTIME:
+            return None
+    except OSError:
+        return None
+    
+    return ENV
+
+def _load_env(use_cache: bool = True) -> Dict[str, str]:
+    """Load the .env file once and snapshot the process environment"""
+    global _env_loaded, _ENV, _DOTENV_KEYS
+    if not _env_loaded:
+        cached = _load_env_cache() if use_cache else None
+        process_keys = set(os.environ)
+        if cached is None:
+            load_dotenv()
+        else:
+            # Apply the compiled values like load_dotenv(): the process environment takes precedence
+            for key, value in cached.items():
+                os.environ.setdefault(key, value)
+        _DOTENV_KEYS = frozenset(os.environ.keys() - process_keys)
+        _ENV = dict(os.environ)
+        _env_loaded = True
+    return _ENV
+
+_load_env()
+
+# Static option sets
+_IMAGE_SIZES = ("1024x1024", "1792x1024", "1024x1792")
+_SUPPORTED_MODELS = ("dall-e-3", "dall-e-2")
 
 class Settings:
     """Application settings and configuration"""
     
     # OpenAI Configuration
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "dall-e-3")
-    DEFAULT_IMAGE_SIZE = os.getenv("DEFAULT_IMAGE_SIZE", "1024x1024")
-    MAX_IMAGES_PER_BATCH = int(os.getenv("MAX_IMAGES_PER_BATCH", "10"))
+    OPENAI_API_KEY = _ENV.get("OPENAI_API_KEY")
+    DEFAULT_MODEL = _ENV.get("DEFAULT_MODEL", "dall-e-3")
+    DEFAULT_IMAGE_SIZE = _ENV.get("DEFAULT_IMAGE_SIZE", "1024x1024")
+    MAX_IMAGES_PER_BATCH = int(_ENV.get("MAX_IMAGES_PER_BATCH", "10"))
     
     # Application Settings
     APP_TITLE = "BrandGen - AI Marketing Image Generator"
@@ -27,7 +73,7 @@ class Settings:
     CONFIG_DIR = "config"
     
     # Streamlit Configuration
-    STREAMLIT_THEME = os.getenv("STREAMLIT_THEME", "light")
+    STREAMLIT_THEME = _ENV.get("STREAMLIT_THEME", "light")
     
     # Image Generation Settings
     IMAGE_QUALITY = "standard"  # standard or hd
@@ -35,26 +81,63 @@ class Settings:
     
     # Data Processing Settings
     MAX_UPLOAD_SIZE_MB = 100
-    SUPPORTED_FILE_TYPES = ["csv", "xlsx", "json"]
+    SUPPORTED_FILE_TYPES = frozenset(("csv", "xlsx", "json"))
     
     # Campaign Settings
     DEFAULT_CAMPAIGN_DURATION = 30  # days
     MIN_CAMPAIGN_BUDGET = 100      # USD
     
+    # Cached validate_api_key() result, reset by invalidate()
+    _api_key_valid = None
+    
+    @classmethod
+    def reload_env(cls) -> None:
+        """
+        Discard the environment snapshot and re-read .env and os.environ
+        
+        As on import, variables set in the process environment take precedence
+        over .env; values previously loaded from .env are replaced by its
+        current contents.
+        """
+        global _env_loaded
+        for key in _DOTENV_KEYS:
+            os.environ.pop(key, None)
+        _env_loaded = False
+        env = _load_env(use_cache=False)
+        
+        cls.OPENAI_API_KEY = env.get("OPENAI_API_KEY")
+        cls.DEFAULT_MODEL = env.get("DEFAULT_MODEL", "dall-e-3")
+        cls.DEFAULT_IMAGE_SIZE = env.get("DEFAULT_IMAGE_SIZE", "1024x1024")
+        cls.MAX_IMAGES_PER_BATCH = int(env.get("MAX_IMAGES_PER_BATCH", "10"))
+        cls.STREAMLIT_THEME = env.get("STREAMLIT_THEME", "light")
+        cls.invalidate()
+    
+    @classmethod
+    def invalidate(cls) -> None:
+        """Forget cached validation results (e.g. after rotating the API key)"""
+        cls._api_key_valid = None
+    
     @classmethod
     def validate_api_key(cls) -> bool:
         """Validate if OpenAI API key is present"""
-        return cls.OPENAI_API_KEY is not None and len(cls.OPENAI_API_KEY) > 0
+        if cls._api_key_valid is None:
+            cls._api_key_valid = bool(cls.OPENAI_API_KEY)
+        return cls._api_key_valid
     
     @classmethod
-    def get_image_sizes(cls) -> list:
+    def get_image_sizes(cls) -> tuple:
         """Get available image sizes for DALL-E"""
-        return ["1024x1024", "1792x1024", "1024x1792"]
+        return _IMAGE_SIZES
     
     @classmethod
-    def get_supported_models(cls) -> list:
+    def get_supported_models(cls) -> tuple:
         """Get supported DALL-E models"""
-        return ["dall-e-3", "dall-e-2"]
+        return _SUPPORTED_MODELS
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the shared Settings instance (use get_settings.cache_clear() to reset)"""
+    return Settings()
 
 # Create global settings instance
-settings = Settings()
+settings = get_settings()
@@ -3,9 +3,14 @@ BrandGen Setup Script
 Run this script to set up your BrandGen environment
 """
 
+import csv
+import io
 import os
+import pprint
 import shutil
+import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 def create_directories():
@@ -19,31 +24,37 @@ def create_directories():
         'tests'
     ]
     
+    # mkdir releases the GIL, so the syscalls overlap across threads
+    with ThreadPoolExecutor(max_workers=len(directories)) as executor:
+        list(executor.map(lambda d: Path(d).mkdir(exist_ok=True), directories))
+    
     for directory in directories:
-        Path(directory).mkdir(exist_ok=True)
         print(f"✅ Created directory: {directory}")
 
-def create_env_file():
+def create_env_file(present: set):
     """Create .env file from template."""
     template_path = '.env.template'
     env_path = '.env'
     
-    if os.path.exists(template_path) and not os.path.exists(env_path):
+    if template_path in present and env_path not in present:
         shutil.copy(template_path, env_path)
         print(f"✅ Created {env_path} from template")
         print("📝 Please edit .env file and add your OpenAI API key")
-    elif os.path.exists(env_path):
+    elif env_path in present:
         print(f"ℹ️  {env_path} already exists")
     else:
         print(f"⚠️  Template file {template_path} not found")
 
-def install_requirements():
+def install_requirements(present: set):
     """Install required packages."""
     requirements_file = 'requirements.txt'
     
-    if os.path.exists(requirements_file):
+    if requirements_file in present:
         print("📦 Installing required packages...")
-        os.system(f"{sys.executable} -m pip install -r {requirements_file}")
+        subprocess.run(
+            [sys.executable, "-m", "pip", "install", "--no-input", "-r", requirements_file],
+            check=True
+        )
         print("✅ Requirements installed")
     else:
         print("⚠️  requirements.txt not found")
@@ -51,22 +62,47 @@ def install_requirements():
 def create_sample_data():
     """Create sample data files."""
     # Sample customer data
-    sample_csv_content = """customer_id,age,income,spending_score,purchase_frequency,preferred_category,engagement_rate,digital_savvy,brand_loyalty
-1,25,45000,67,3,Fashion,0.75,8,0.6
-2,34,67000,82,5,Technology,0.85,9,0.8
-3,45,89000,45,2,Automotive,0.45,5,0.7
-4,28,52000,73,4,Beauty,0.82,7,0.65
-5,52,95000,38,1,Luxury,0.35,4,0.9
-"""
+    header = ('customer_id', 'age', 'income', 'spending_score', 'purchase_frequency',
+              'preferred_category', 'engagement_rate', 'digital_savvy', 'brand_loyalty')
+    rows = [
+        (1, 25, 45000, 67, 3, 'Fashion', 0.75, 8, 0.6),
+        (2, 34, 67000, 82, 5, 'Technology', 0.85, 9, 0.8),
+        (3, 45, 89000, 45, 2, 'Automotive', 0.45, 5, 0.7),
+        (4, 28, 52000, 73, 4, 'Beauty', 0.82, 7, 0.65),
+        (5, 52, 95000, 38, 1, 'Luxury', 0.35, 4, 0.9)
+    ]
     
     data_dir = Path('data')
     customer_file = data_dir / 'customer_segments.csv'
     
     if not customer_file.exists():
-        with open(customer_file, 'w') as f:
-            f.write(sample_csv_content)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+        customer_file.write_text(buffer.getvalue())
         print("✅ Created sample customer data")
 
+def compile_env():
+    """Compile .env into config/env_cache.py so settings can import it without parsing."""
+    env_path = '.env'
+    
+    if not os.path.exists(env_path):
+        print(f"ℹ️  {env_path} not found, skipping environment cache")
+        return
+    
+    from dotenv import dotenv_values
+    
+    values = {key: value for key, value in dotenv_values(env_path).items() if value is not None}
+    cache_content = (
+        '"""\nGenerated by setup.py from .env - do not edit, re-run setup.py instead\n"""\n\n'
+        f"ENV_MTIME = {os.path.getmtime(env_path)!r}\n"
+        f"ENV = {pprint.pformat(values)}\n"
+    )
+    
+    Path('config', 'env_cache.py').write_text(cache_content)
+    print("✅ Compiled .env to config/env_cache.py")
+
 def main():
     """Main setup function."""
     print("🎨 BrandGen Setup")
@@ -74,14 +110,19 @@ def main():
     
     try:
         create_directories()
-        create_env_file()
+        
+        # List the project root once for the idempotence checks below
+        present = set(os.listdir('.'))
+        
+        create_env_file(present)
         create_sample_data()
-        install_requirements()
+        install_requirements(present)
+        compile_env()
         
         print("\n" + "=" * 50)
         print("✅ Setup completed successfully!")
         print("\n📋 Next steps:")
-        print("1. Edit .env file and add your OpenAI API key")
+        print("1. Edit .env file and add your OpenAI API key, then re-run setup to refresh the env cache")
         print("2. Run: streamlit run streamlit_app.py")
         print("3. Open your browser to the provided URL")
         print("\n💡 Need help? Check the README.md file")
@@ -2,10 +2,13 @@
 Campaign management module for BrandGen
 """
 
-import json
 import os
+from dataclasses import dataclass
+from itertools import product
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Dict, List, Any, Optional, Tuple
+import numpy as np
+import orjson
 import pandas as pd
 import logging
 
@@ -16,6 +19,50 @@ from .image_generator import ImageGenerator
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fields every campaign config must define
+_REQUIRED_CAMPAIGN_FIELDS = frozenset({'name', 'product', 'target_audience', 'style', 'mood'})
+
+# Random source for mock performance data
+_rng = np.random.default_rng()
+
+# Overall metrics as (name, numerator key, denominator key, scale)
+_OVERALL_METRICS = (
+    ('engagement_rate', 'total_engagements', 'total_impressions', 100),
+    ('click_through_rate', 'total_clicks', 'total_impressions', 100),
+    ('conversion_rate', 'total_conversions', 'total_clicks', 100),
+    ('cost_per_acquisition', 'total_spend', 'total_conversions', 1),
+    ('return_on_ad_spend', 'total_revenue', 'total_spend', 100)
+)
+
+# Per-segment metrics in the same layout
+_SEGMENT_METRICS = (
+    ('engagement_rate', 'engagements', 'impressions', 100),
+    ('conversion_rate', 'conversions', 'clicks', 100),
+    ('roi', 'revenue', 'spend', 100)
+)
+
+# Export options: native NumPy arrays/scalars, int segment keys; indented for whole-file exports
+_STREAM_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+_JSON_OPTIONS = _STREAM_JSON_OPTIONS | orjson.OPT_INDENT_2
+
+@dataclass
+class Campaign:
+    """State of a single marketing campaign"""
+    __slots__ = ('id', 'config', 'created_at', 'status', 'customer_data', 'segments', 'insights',
+                 'generated_images', 'saved_files', 'performance_metrics', 'history')
+    
+    id: str
+    config: Dict[str, Any]
+    created_at: str
+    status: str
+    customer_data: Optional[pd.DataFrame]
+    segments: Optional[Dict[str, Any]]
+    insights: Dict[str, Any]
+    generated_images: List[Dict[str, Any]]
+    saved_files: List[str]
+    performance_metrics: Dict[str, Any]
+    history: List[str]
+
 class CampaignManager:
     """Manages marketing campaigns from creation to analysis"""
     
@@ -28,7 +75,7 @@ class CampaignManager:
         """
         self.data_processor = DataProcessor()
         self.image_generator = ImageGenerator(api_key)
-        self.campaigns: Dict[str, Dict[str, Any]] = {}
+        self.campaigns: Dict[str, Campaign] = {}
         
     def create_campaign(self, 
                        campaign_config: Dict[str, Any],
@@ -43,27 +90,30 @@ class CampaignManager:
         Returns:
             Campaign ID
         """
-        # Generate unique campaign ID
-        campaign_id = f"campaign_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Generate unique campaign ID (one timestamp for the ID, creation time and history)
+        now = datetime.now()
+        created_at = now.isoformat()
+        campaign_id = f"campaign_{now.strftime('%Y%m%d_%H%M%S')}"
         
         # Validate required fields
-        required_fields = ['name', 'product', 'target_audience', 'style', 'mood']
-        for field in required_fields:
-            if field not in campaign_config:
-                raise ValueError(f"Missing required field: {field}")
+        missing_fields = _REQUIRED_CAMPAIGN_FIELDS.difference(campaign_config)
+        if missing_fields:
+            raise ValueError(f"Missing required field: {', '.join(sorted(missing_fields))}")
         
         # Create campaign structure
-        campaign = {
-            'id': campaign_id,
-            'config': campaign_config,
-            'created_at': datetime.now().isoformat(),
-            'status': 'created',
-            'customer_data': customer_data.to_dict() if customer_data is not None else None,
-            'segments': None,
-            'generated_images': [],
-            'performance_metrics': {},
-            'history': [f"Campaign created at {datetime.now().isoformat()}"]
-        }
+        campaign = Campaign(
+            id=campaign_id,
+            config=campaign_config,
+            created_at=created_at,
+            status='created',
+            customer_data=customer_data,
+            segments=None,
+            insights={},
+            generated_images=[],
+            saved_files=[],
+            performance_metrics={},
+            history=[f"Campaign created at {created_at}"]
+        )
         
         self.campaigns[campaign_id] = campaign
         logger.info(f"Created campaign: {campaign_id}")
@@ -90,11 +140,11 @@ class CampaignManager:
         
         campaign = self.campaigns[campaign_id]
         
-        if campaign['customer_data'] is None:
+        if campaign.customer_data is None:
             raise ValueError("No customer data available for analysis")
         
         # Load customer data
-        customer_df = pd.DataFrame(campaign['customer_data'])
+        customer_df = campaign.customer_data
         self.data_processor.data = customer_df
         
         # Clean data
@@ -116,15 +166,16 @@ class CampaignManager:
         insights = self.data_processor.generate_insights()
         
         # Update campaign
-        campaign['segments'] = segmentation_results
-        campaign['insights'] = insights
-        campaign['status'] = 'analyzed'
-        campaign['history'].append(f"Audience analysis completed at {datetime.now().isoformat()}")
+        campaign.segments = segmentation_results
+        campaign.insights = insights
+        campaign.status = 'analyzed'
+        campaign.history.append(f"Audience analysis completed at {datetime.now().isoformat()}")
         
         logger.info(f"Completed audience analysis for campaign {campaign_id}")
         
         return {
             'segmentation': segmentation_results,
+            'segment_table': self.data_processor.segment_table,
             'insights': insights
         }
     
@@ -132,7 +183,8 @@ class CampaignManager:
                                 campaign_id: str,
                                 images_per_segment: int = 2,
                                 image_size: str = "1024x1024",
-                                quality: str = "standard") -> Dict[str, Any]:
+                                quality: str = "standard",
+                                progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
         """
         Generate personalized images for campaign segments
         
@@ -141,6 +193,7 @@ class CampaignManager:
             images_per_segment: Number of images to generate per segment
             image_size: Size of generated images
             quality: Image quality setting
+            progress_callback: Called as (completed, total) images while generation runs
             
         Returns:
             Generation results
@@ -150,28 +203,26 @@ class CampaignManager:
         
         campaign = self.campaigns[campaign_id]
         
-        if campaign['segments'] is None:
+        if campaign.segments is None:
             raise ValueError("No segments available. Please run audience analysis first.")
         
         # Generate personalized prompts
         prompts = self.image_generator.generate_personalized_prompts(
-            campaign_data=campaign['config'],
-            segment_data=campaign['segments']['segments']
+            campaign_data=campaign.config,
+            segment_data=campaign.segments['segments']
         )
         
         # Generate multiple images per segment if requested
-        all_prompts = []
-        for prompt in prompts:
-            for i in range(images_per_segment):
-                variant_prompt = prompt + f" (Variation {i+1})"
-                all_prompts.append(variant_prompt)
-        
-        # Generate images
-        generation_results = self.image_generator.generate_batch(
+        all_prompts = [f"{prompt} (Variation {i + 1})"
+                       for prompt, i in product(prompts, range(images_per_segment))]
+        
+        # Generate images concurrently
+        generation_results = self.image_generator.generate_batch_concurrent(
             prompts=all_prompts,
             size=image_size,
             quality=quality,
-            style=campaign['config'].get('style', 'vivid')
+            style=campaign.config.get('style', 'vivid'),
+            progress_callback=progress_callback
         )
         
         # Save images
@@ -179,14 +230,14 @@ class CampaignManager:
         saved_files = self.image_generator.save_batch_results(
             results=generation_results,
             output_dir=output_dir,
-            prefix=f"{campaign['config']['name']}_segment"
+            prefix=f"{campaign.config['name']}_segment"
         )
         
         # Update campaign
-        campaign['generated_images'] = generation_results
-        campaign['saved_files'] = saved_files
-        campaign['status'] = 'generated'
-        campaign['history'].append(f"Images generated at {datetime.now().isoformat()}")
+        campaign.generated_images = generation_results
+        campaign.saved_files = saved_files
+        campaign.status = 'generated'
+        campaign.history.append(f"Images generated at {datetime.now().isoformat()}")
         
         logger.info(f"Generated {len(saved_files)} images for campaign {campaign_id}")
         
@@ -220,53 +271,73 @@ class CampaignManager:
             performance_data = self._generate_mock_performance_data(campaign)
         
         # Calculate key metrics
-        metrics = {
-            'engagement_rate': performance_data.get('total_engagements', 0) / max(performance_data.get('total_impressions', 1), 1) * 100,
-            'click_through_rate': performance_data.get('total_clicks', 0) / max(performance_data.get('total_impressions', 1), 1) * 100,
-            'conversion_rate': performance_data.get('total_conversions', 0) / max(performance_data.get('total_clicks', 1), 1) * 100,
-            'cost_per_acquisition': performance_data.get('total_spend', 0) / max(performance_data.get('total_conversions', 1), 1),
-            'return_on_ad_spend': performance_data.get('total_revenue', 0) / max(performance_data.get('total_spend', 1), 1) * 100
-        }
+        metrics = dict(zip(
+            (name for name, _, _, _ in _OVERALL_METRICS),
+            self._compute_ratios([performance_data], _OVERALL_METRICS)[0]
+        ))
         
         # Segment performance analysis
         segment_performance = {}
-        if 'segment_data' in performance_data:
-            for segment_id, segment_perf in performance_data['segment_data'].items():
-                segment_performance[segment_id] = {
-                    'engagement_rate': segment_perf.get('engagements', 0) / max(segment_perf.get('impressions', 1), 1) * 100,
-                    'conversion_rate': segment_perf.get('conversions', 0) / max(segment_perf.get('clicks', 1), 1) * 100,
-                    'roi': segment_perf.get('revenue', 0) / max(segment_perf.get('spend', 1), 1) * 100
-                }
+        segment_data = performance_data.get('segment_data')
+        if segment_data:
+            segment_ratios = self._compute_ratios(list(segment_data.values()), _SEGMENT_METRICS)
+            names = [name for name, _, _, _ in _SEGMENT_METRICS]
+            segment_performance = {
+                segment_id: dict(zip(names, ratios))
+                for segment_id, ratios in zip(segment_data, segment_ratios)
+            }
         
         # Generate recommendations
         recommendations = self._generate_recommendations(metrics, segment_performance)
         
         # Update campaign
-        campaign['performance_metrics'] = {
+        analyzed_at = datetime.now().isoformat()
+        campaign.performance_metrics = {
             'overall_metrics': metrics,
             'segment_performance': segment_performance,
             'recommendations': recommendations,
-            'analyzed_at': datetime.now().isoformat()
+            'analyzed_at': analyzed_at
         }
-        campaign['status'] = 'analyzed'
-        campaign['history'].append(f"Performance analysis completed at {datetime.now().isoformat()}")
+        campaign.status = 'analyzed'
+        campaign.history.append(f"Performance analysis completed at {analyzed_at}")
         
-        return campaign['performance_metrics']
+        return campaign.performance_metrics
     
-    def _generate_mock_performance_data(self, campaign: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate mock performance data for demonstration"""
-        import random
+    def _compute_ratios(self,
+                        records: List[Dict[str, Any]],
+                        metric_specs: Tuple[Tuple[str, str, str, int], ...]) -> List[List[float]]:
+        """
+        Compute ratio metrics for several records in one array operation
         
-        total_impressions = random.randint(10000, 100000)
-        total_clicks = random.randint(int(total_impressions * 0.01), int(total_impressions * 0.05))
-        total_conversions = random.randint(int(total_clicks * 0.02), int(total_clicks * 0.08))
-        total_spend = random.randint(500, 5000)
-        total_revenue = random.randint(int(total_spend * 1.2), int(total_spend * 3.5))
+        Args:
+            records: Performance records (one row per record)
+            metric_specs: (name, numerator key, denominator key, scale) tuples
+            
+        Returns:
+            One list of metric values per record, in metric_specs order
+        """
+        numerators = np.array([[record.get(num, 0) for _, num, _, _ in metric_specs] for record in records],
+                              dtype=np.float64)
+        denominators = np.array([[record.get(den, 1) for _, _, den, _ in metric_specs] for record in records],
+                                dtype=np.float64)
+        scales = np.array([scale for _, _, _, scale in metric_specs], dtype=np.float64)
+        
+        # Guard against zero denominators, as max(x, 1) did
+        return (numerators / np.maximum(denominators, 1) * scales).tolist()
+    
+    def _generate_mock_performance_data(self, campaign: Campaign) -> Dict[str, Any]:
+        """Generate mock performance data for demonstration"""
+        # Bounds are inclusive, as with random.randint
+        total_impressions = int(_rng.integers(10000, 100000, endpoint=True))
+        total_clicks = int(_rng.integers(int(total_impressions * 0.01), int(total_impressions * 0.05), endpoint=True))
+        total_conversions = int(_rng.integers(int(total_clicks * 0.02), int(total_clicks * 0.08), endpoint=True))
+        total_spend = int(_rng.integers(500, 5000, endpoint=True))
+        total_revenue = int(_rng.integers(int(total_spend * 1.2), int(total_spend * 3.5), endpoint=True))
         
         return {
             'total_impressions': total_impressions,
             'total_clicks': total_clicks,
-            'total_engagements': random.randint(total_clicks, int(total_clicks * 1.5)),
+            'total_engagements': int(_rng.integers(total_clicks, int(total_clicks * 1.5), endpoint=True)),
             'total_conversions': total_conversions,
             'total_spend': total_spend,
             'total_revenue': total_revenue
@@ -312,23 +383,60 @@ class CampaignManager:
         
         summary = {
             'campaign_info': {
-                'id': campaign['id'],
-                'name': campaign['config']['name'],
-                'status': campaign['status'],
-                'created_at': campaign['created_at'],
-                'product': campaign['config']['product']
+                'id': campaign.id,
+                'name': campaign.config['name'],
+                'status': campaign.status,
+                'created_at': campaign.created_at,
+                'product': campaign.config['product']
             },
-            'audience_analysis': campaign.get('insights', {}),
+            'audience_analysis': campaign.insights,
             'image_generation': {
-                'total_images': len(campaign.get('generated_images', [])),
-                'successful_generations': sum(1 for img in campaign.get('generated_images', []) if img.get('success', False))
+                'total_images': len(campaign.generated_images),
+                'successful_generations': sum(1 for img in campaign.generated_images if img.get('success', False))
             },
-            'performance': campaign.get('performance_metrics', {}),
-            'history': campaign['history']
+            'performance': campaign.performance_metrics,
+            'history': campaign.history
         }
         
         return summary
     
+    def export_campaign_summary_stream(self, campaign_id: str, path: str) -> str:
+        """
+        Export the campaign summary plus every generated image record as JSON
+        
+        Each section is serialized and written on its own, so the combined
+        document is never built in memory. Raw image bytes are left out of
+        the image records.
+        
+        Args:
+            campaign_id: Campaign identifier
+            path: Output JSON file path
+            
+        Returns:
+            Path of the written file
+        """
+        summary = self.get_campaign_summary(campaign_id)
+        generated_images = self.campaigns[campaign_id].generated_images
+        
+        with open(path, 'wb') as f:
+            f.write(b'{')
+            for key, value in summary.items():
+                f.write(orjson.dumps(key))
+                f.write(b':')
+                f.write(orjson.dumps(value, default=str, option=_STREAM_JSON_OPTIONS))
+                f.write(b',')
+            
+            f.write(b'"generated_images":[')
+            for i, image in enumerate(generated_images):
+                if i:
+                    f.write(b',')
+                record = {key: value for key, value in image.items() if key != 'image_data'}
+                f.write(orjson.dumps(record, default=str, option=_STREAM_JSON_OPTIONS))
+            f.write(b']}')
+        
+        logger.info(f"Streamed campaign summary to {path}")
+        return path
+    
     def export_campaign_data(self, 
                            campaign_id: str,
                            output_dir: str = "exports") -> Dict[str, str]:
@@ -352,27 +460,42 @@ class CampaignManager:
         
         # Export campaign summary
         summary_path = os.path.join(output_dir, f"{campaign_id}_summary.json")
-        with open(summary_path, 'w') as f:
-            json.dump(self.get_campaign_summary(campaign_id), f, indent=2, default=str)
+        self._write_json(summary_path, self.get_campaign_summary(campaign_id))
         exported_files['summary'] = summary_path
         
+        # Export customer data as columnar Parquet if available
+        if campaign.customer_data is not None:
+            import pyarrow as pa
+            customers_path = os.path.join(output_dir, f"{campaign_id}_customers.parquet")
+            try:
+                campaign.customer_data.to_parquet(customers_path, index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                # Columns pyarrow can't convert (e.g. mixed-type values) are written as CSV instead
+                logger.warning(f"Could not export customer data as Parquet, writing CSV instead: {str(e)}")
+                customers_path = os.path.join(output_dir, f"{campaign_id}_customers.csv")
+                campaign.customer_data.to_csv(customers_path, index=False)
+            exported_files['customers'] = customers_path
+        
         # Export customer segments if available
-        if campaign.get('segments'):
+        if campaign.segments:
             segments_path = os.path.join(output_dir, f"{campaign_id}_segments.json")
-            with open(segments_path, 'w') as f:
-                json.dump(campaign['segments'], f, indent=2, default=str)
+            self._write_json(segments_path, campaign.segments)
             exported_files['segments'] = segments_path
         
         # Export performance metrics if available
-        if campaign.get('performance_metrics'):
+        if campaign.performance_metrics:
             performance_path = os.path.join(output_dir, f"{campaign_id}_performance.json")
-            with open(performance_path, 'w') as f:
-                json.dump(campaign['performance_metrics'], f, indent=2, default=str)
+            self._write_json(performance_path, campaign.performance_metrics)
             exported_files['performance'] = performance_path
         
         logger.info(f"Exported campaign data to {len(exported_files)} files")
         return exported_files
     
+    def _write_json(self, path: str, data: Any) -> None:
+        """Write data to path as indented JSON, using str() for unsupported types"""
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, default=str, option=_JSON_OPTIONS))
+    
     def list_campaigns(self) -> List[Dict[str, Any]]:
         """List all campaigns with basic information"""
         campaign_list = []
@@ -380,11 +503,11 @@ class CampaignManager:
         for campaign_id, campaign in self.campaigns.items():
             campaign_list.append({
                 'id': campaign_id,
-                'name': campaign['config']['name'],
-                'status': campaign['status'],
-                'created_at': campaign['created_at'],
-                'product': campaign['config']['product'],
-                'images_generated': len(campaign.get('generated_images', []))
+                'name': campaign.config['name'],
+                'status': campaign.status,
+                'created_at': campaign.created_at,
+                'product': campaign.config['product'],
+                'images_generated': len(campaign.generated_images)
             })
         
         return campaign_list
@@ -4,7 +4,7 @@ Handles all configuration settings, API keys, and environment variables.
 """
 
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Mapping, Optional
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -28,6 +28,9 @@ class Config:
     TEMPLATES_FILE = os.path.join(DATA_DIR, "campaign_templates.json")
     CUSTOMER_DATA_FILE = os.path.join(DATA_DIR, "customer_segments.csv")
     
+    # Upload parsing: "pyarrow" (multi-threaded) or "c" (pandas default)
+    CSV_ENGINE = "pyarrow"
+    
     # Streamlit Configuration
     PAGE_TITLE = "BrandGen - AI Marketing Image Generator"
     PAGE_ICON = "🎨"
@@ -42,25 +45,25 @@ class Config:
     """
     
     # Marketing Campaign Settings
-    CAMPAIGN_TYPES = [
+    CAMPAIGN_TYPES = (
         "Product Launch",
         "Brand Awareness", 
         "Seasonal Promotion",
         "Social Media Campaign",
         "Email Marketing",
         "Website Banner"
-    ]
+    )
     
-    IMAGE_STYLES = [
+    IMAGE_STYLES = (
         "Photorealistic",
         "Artistic/Stylized", 
         "Minimalist",
         "Vintage/Retro",
         "Modern/Contemporary",
         "Luxury/Premium"
-    ]
+    )
     
-    TARGET_AUDIENCES = [
+    TARGET_AUDIENCES = (
         "Young Adults (18-30)",
         "Professionals (25-45)", 
         "Families (30-50)",
@@ -68,7 +71,7 @@ class Config:
         "Tech Enthusiasts",
         "Luxury Buyers",
         "Budget Conscious"
-    ]
+    )
 
 def get_config() -> Dict[str, Any]:
     """Return configuration as dictionary."""
@@ -80,8 +83,13 @@ def get_config() -> Dict[str, Any]:
         'templates_file': Config.TEMPLATES_FILE
     }
 
-def validate_config() -> bool:
-    """Validate that all required configuration is present."""
-    if not Config.OPENAI_API_KEY:
+def validate_config(env: Optional[Mapping[str, str]] = None) -> bool:
+    """Validate that all required configuration is present.
+    
+    Checks the loaded Config by default; pass env to check a given
+    environment mapping instead (e.g. one injected by a test).
+    """
+    api_key = Config.OPENAI_API_KEY if env is None else env.get('OPENAI_API_KEY')
+    if not api_key:
         return False
     return True
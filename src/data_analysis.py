@@ -5,15 +5,123 @@ Handles customer segmentation, campaign analysis, and data processing.
 
 import pandas as pd
 import numpy as np
+import hashlib
 import json
 from typing import Dict, List, Any, Tuple
 import os
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+from functools import lru_cache
+from itertools import product
 import plotly.express as px
 import plotly.graph_objects as go
 from src.config import Config
 
+# Product categories used for generated sample customers
+PREFERRED_CATEGORIES = ['Fashion', 'Technology', 'Food', 'Beauty', 'Automotive']
+
+# Segment naming and recommendation rules. These depend only on which side of
+# a few thresholds each profile value falls, so results are cached on those
+# bin indices or threshold tests rather than on the raw (never repeating) means;
+# callers get fresh lists/dicts built from the cached tuples.
+
+# Segment name thresholds; labels[i] applies to values between bins[i-1] and bins[i]
+_AGE_BINS = np.array([30, 50])
+_AGE_LABELS = ('Young', 'Middle-aged', 'Mature')
+_INCOME_BINS = np.array([45000, 75000])
+_INCOME_LABELS = ('Budget-conscious', 'Mid-income', 'High-income')
+_DIGITAL_BINS = np.array([4, 7])
+_DIGITAL_LABELS = ('Traditional', 'Moderate-tech', 'Tech-savvy')
+
+def _segment_names(ages: np.ndarray, incomes: np.ndarray, digital: np.ndarray) -> List[str]:
+    """Build descriptive segment names for arrays of profile values."""
+    # Age thresholds start the next group (age < 30 is Young); income and
+    # digital thresholds end the previous one (income > 75000 is High-income)
+    age_groups = np.searchsorted(_AGE_BINS, ages, side='right')
+    income_levels = np.searchsorted(_INCOME_BINS, incomes, side='left')
+    tech_levels = np.searchsorted(_DIGITAL_BINS, digital, side='left')
+    
+    return [_segment_name(a, i, d)
+            for a, i, d in zip(age_groups.tolist(), income_levels.tolist(), tech_levels.tolist())]
+
+@lru_cache(maxsize=None)
+def _segment_name(age_group: int, income_level: int, tech_level: int) -> str:
+    """Build the descriptive segment name for the given label indices."""
+    return f"{_AGE_LABELS[age_group]} {_INCOME_LABELS[income_level]} {_DIGITAL_LABELS[tech_level]}"
+
+@lru_cache(maxsize=None)
+def _channels(high_digital: bool, low_digital: bool, young: bool, affluent: bool) -> Tuple[str, ...]:
+    """Marketing channels for digital > 6, digital < 5, age < 35 and income > 60000."""
+    channels = []
+    
+    if high_digital:
+        channels.extend(['Social Media', 'Email Marketing', 'Online Ads'])
+    if young:
+        channels.extend(['Instagram', 'TikTok', 'YouTube'])
+    if affluent:
+        channels.extend(['Premium Publications', 'LinkedIn'])
+    if low_digital:
+        channels.extend(['Traditional Media', 'Print Ads', 'Radio'])
+        
+    return tuple(set(channels))
+
+@lru_cache(maxsize=None)
+def _campaign_types(loyal: bool, big_spender: bool, young: bool, tech_savvy: bool) -> Tuple[str, ...]:
+    """Campaign types for loyalty > 0.7, spending > 70, age < 30 and digital > 7."""
+    campaigns = []
+    
+    if loyal:
+        campaigns.append('Loyalty Program')
+    if big_spender:
+        campaigns.append('Premium Product Launch')
+    if young:
+        campaigns.append('Trend-focused Campaign')
+    if tech_savvy:
+        campaigns.append('Interactive Digital Campaign')
+        
+    return tuple(campaigns)
+
+@lru_cache(maxsize=None)
+def _messaging_tone(young: bool, affluent: bool, tech_savvy: bool) -> str:
+    """Messaging tone for age < 30, income > 75000 and digital > 7."""
+    if young:
+        return "Casual and trendy"
+    elif affluent:
+        return "Professional and sophisticated"
+    elif tech_savvy:
+        return "Tech-forward and innovative"
+    else:
+        return "Friendly and trustworthy"
+
+def _build_budget_allocations() -> Dict[Tuple[bool, bool], Tuple[Tuple[str, float], ...]]:
+    """Precompute the budget allocation for every (tech-savvy, young) combination."""
+    allocations = {}
+    
+    for tech_savvy, young in product((False, True), repeat=2):
+        base_allocation = {
+            'Digital': 0.4,
+            'Traditional': 0.3,
+            'Content Creation': 0.2,
+            'Analytics': 0.1
+        }
+        
+        if tech_savvy:
+            base_allocation['Digital'] += 0.2
+            base_allocation['Traditional'] -= 0.2
+        
+        if young:
+            base_allocation['Content Creation'] += 0.1
+            base_allocation['Analytics'] += 0.1
+            base_allocation['Traditional'] -= 0.2
+            
+        allocations[tech_savvy, young] = tuple(base_allocation.items())
+    
+    return allocations
+
+_BUDGET_ALLOCATIONS = _build_budget_allocations()
+
+def _budget_allocation(digital: float, age: float) -> Tuple[Tuple[str, float], ...]:
+    """Budget allocation (channel, share) pairs for the given profile values."""
+    return _BUDGET_ALLOCATIONS[digital > 7, age < 30]
+
 class DataAnalyzer:
     """Handles all data analysis and customer segmentation tasks."""
     
@@ -21,6 +129,8 @@ class DataAnalyzer:
         self.config = Config()
         self.customer_data = None
         self.segments = None
+        # Segmentation results keyed by (feature fingerprint, n_clusters)
+        self._segmentation_cache: Dict[Tuple[int, int], Dict[str, Any]] = {}
         
     def load_customer_data(self, file_path: str = None) -> pd.DataFrame:
         """Load customer data from CSV file."""
@@ -29,7 +139,8 @@ class DataAnalyzer:
             
         try:
             if os.path.exists(file_path):
-                self.customer_data = pd.read_csv(file_path)
+                self._segmentation_cache.clear()
+                self.customer_data = pd.read_csv(file_path, dtype={'preferred_category': 'category'})
                 return self.customer_data
             else:
                 # Create sample data if file doesn't exist
@@ -38,27 +149,32 @@ class DataAnalyzer:
             print(f"Error loading customer data: {e}")
             return self.generate_sample_customer_data()
     
-    def generate_sample_customer_data(self, n_customers: int = 1000) -> pd.DataFrame:
+    def generate_sample_customer_data(self, n_customers: int = 1000, seed: int = 42) -> pd.DataFrame:
         """Generate sample customer data for demonstration."""
-        np.random.seed(42)
+        rng = np.random.default_rng(seed)
+        
+        # Ensure age is reasonable
+        age = rng.normal(35, 12, n_customers)
+        np.clip(age, 18, 80, out=age)
         
         data = {
-            'customer_id': range(1, n_customers + 1),
-            'age': np.random.normal(35, 12, n_customers).astype(int),
-            'income': np.random.lognormal(10.5, 0.5, n_customers).astype(int),
-            'spending_score': np.random.randint(1, 101, n_customers),
-            'purchase_frequency': np.random.poisson(3, n_customers),
-            'preferred_category': np.random.choice(['Fashion', 'Technology', 'Food', 'Beauty', 'Automotive'], n_customers),
-            'engagement_rate': np.random.beta(2, 5, n_customers),
-            'digital_savvy': np.random.randint(1, 11, n_customers),
-            'brand_loyalty': np.random.beta(3, 2, n_customers)
+            'customer_id': np.arange(1, n_customers + 1, dtype=np.int32),
+            'age': age.astype(np.int16),
+            'income': rng.lognormal(10.5, 0.5, n_customers).astype(np.int32),
+            'spending_score': rng.integers(1, 101, n_customers, dtype=np.int8),
+            'purchase_frequency': rng.poisson(3, n_customers).astype(np.int8),
+            'preferred_category': pd.Categorical.from_codes(
+                rng.integers(0, len(PREFERRED_CATEGORIES), n_customers, dtype=np.int8),
+                categories=PREFERRED_CATEGORIES
+            ),
+            'engagement_rate': rng.beta(2, 5, n_customers).astype(np.float32),
+            'digital_savvy': rng.integers(1, 11, n_customers, dtype=np.int8),
+            'brand_loyalty': rng.beta(3, 2, n_customers).astype(np.float32)
         }
         
+        self._segmentation_cache.clear()
         self.customer_data = pd.DataFrame(data)
         
-        # Ensure age is reasonable
-        self.customer_data['age'] = self.customer_data['age'].clip(18, 80)
-        
         # Save sample data
         os.makedirs(self.config.DATA_DIR, exist_ok=True)
         self.customer_data.to_csv(self.config.CUSTOMER_DATA_FILE, index=False)
@@ -74,21 +190,42 @@ class DataAnalyzer:
         features = ['age', 'income', 'spending_score', 'purchase_frequency', 
                    'engagement_rate', 'digital_savvy', 'brand_loyalty']
         
-        X = self.customer_data[features].copy()
+        # Reuse a previous result for identical feature values, in the same row order, on the same frame
+        row_hashes = pd.util.hash_pandas_object(self.customer_data[features], index=False)
+        fingerprint = hashlib.blake2b(row_hashes.to_numpy().tobytes(), digest_size=16).hexdigest()
+        cache_key = (fingerprint, n_clusters)
+        cached = self._segmentation_cache.get(cache_key)
+        if cached is not None and cached['data'] is self.customer_data:
+            self.customer_data['segment'] = cached['labels']
+            self.segments = cached['result']
+            return self.segments
+        
+        # Fill a fresh C-contiguous float32 matrix column by column; to_numpy() on the
+        # frame would hand back Fortran order, which the clustering step copies again
+        X = np.empty((len(self.customer_data), len(features)), dtype=np.float32)
+        for j, feature in enumerate(features):
+            X[:, j] = self.customer_data[feature].to_numpy()
         
         # Handle missing values
-        X = X.fillna(X.mean())
+        missing = np.isnan(X)
+        if missing.any():
+            X[missing] = np.take(np.nanmean(X, axis=0), np.nonzero(missing)[1])
+        
+        # sklearn (and scipy under it) is only imported once clustering is needed
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.preprocessing import StandardScaler
         
         # Standardize features
-        scaler = StandardScaler()
+        scaler = StandardScaler(copy=False)
         X_scaled = scaler.fit_transform(X)
         
         # Perform clustering
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=1024, n_init=3,
+                                 random_state=42, reassignment_ratio=0.01)
         clusters = kmeans.fit_predict(X_scaled)
         
         # Add cluster labels to data
-        self.customer_data['segment'] = clusters
+        self.customer_data['segment'] = clusters.astype(np.int16)
         
         # Generate segment profiles
         segment_profiles = self._generate_segment_profiles()
@@ -98,6 +235,11 @@ class DataAnalyzer:
             'profiles': segment_profiles,
             'n_clusters': n_clusters
         }
+        self._segmentation_cache[cache_key] = {
+            'data': self.customer_data,
+            'labels': self.customer_data['segment'].to_numpy(),
+            'result': self.segments
+        }
         
         return self.segments
     
@@ -105,55 +247,67 @@ class DataAnalyzer:
         """Generate descriptive profiles for each customer segment."""
         profiles = {}
         
-        for segment in self.customer_data['segment'].unique():
-            segment_data = self.customer_data[self.customer_data['segment'] == segment]
-            
+        # Aggregate every segment in a single grouped pass
+        grouped = self.customer_data.groupby('segment', sort=False)
+        segment_stats = grouped.agg(
+            size=('age', 'size'),
+            avg_age=('age', 'mean'),
+            avg_income=('income', 'mean'),
+            avg_spending_score=('spending_score', 'mean'),
+            avg_engagement=('engagement_rate', 'mean'),
+            digital_savvy_score=('digital_savvy', 'mean'),
+            brand_loyalty_score=('brand_loyalty', 'mean')
+        )
+        category_table, categories = self._category_table()
+        
+        # Name every segment in one pass
+        names = _segment_names(segment_stats['avg_age'].to_numpy(),
+                               segment_stats['avg_income'].to_numpy(),
+                               segment_stats['digital_savvy_score'].to_numpy())
+        
+        for row, name in zip(segment_stats.itertuples(), names):
+            segment = row.Index
             profile = {
-                'size': len(segment_data),
-                'avg_age': segment_data['age'].mean(),
-                'avg_income': segment_data['income'].mean(),
-                'avg_spending_score': segment_data['spending_score'].mean(),
-                'preferred_categories': segment_data['preferred_category'].value_counts().to_dict(),
-                'avg_engagement': segment_data['engagement_rate'].mean(),
-                'digital_savvy_score': segment_data['digital_savvy'].mean(),
-                'brand_loyalty_score': segment_data['brand_loyalty'].mean()
+                'size': int(row.size),
+                'avg_age': row.avg_age,
+                'avg_income': row.avg_income,
+                'avg_spending_score': row.avg_spending_score,
+                'preferred_categories': self._observed_counts(category_table[segment], categories),
+                'avg_engagement': row.avg_engagement,
+                'digital_savvy_score': row.digital_savvy_score,
+                'brand_loyalty_score': row.brand_loyalty_score
             }
             
-            # Generate segment name based on characteristics
-            profile['name'] = self._generate_segment_name(profile)
+            profile['name'] = name
             profiles[segment] = profile
             
         return profiles
     
+    def _category_table(self) -> Tuple[np.ndarray, pd.Index]:
+        """Count preferred categories per segment as a (segment, category) contingency table."""
+        category = self.customer_data['preferred_category']
+        if not isinstance(category.dtype, pd.CategoricalDtype):
+            category = category.astype('category')
+        
+        codes = category.cat.codes.to_numpy()
+        segments = self.customer_data['segment'].to_numpy()
+        n_categories = len(category.cat.categories)
+        
+        # Missing categories have code -1 and are not counted, as in value_counts()
+        observed = codes >= 0
+        flat = segments[observed].astype(np.int64) * n_categories + codes[observed]
+        table = np.bincount(flat, minlength=(int(segments.max()) + 1) * n_categories)
+        
+        return table.reshape(-1, n_categories), category.cat.categories
+    
+    def _observed_counts(self, counts: np.ndarray, categories: pd.Index) -> Dict[str, int]:
+        """Map observed categories to their counts, most frequent first."""
+        return {categories[i]: int(counts[i]) for i in np.argsort(-counts, kind='stable') if counts[i] > 0}
+    
     def _generate_segment_name(self, profile: Dict[str, Any]) -> str:
         """Generate descriptive name for customer segment."""
-        age = profile['avg_age']
-        income = profile['avg_income']
-        spending = profile['avg_spending_score']
-        digital = profile['digital_savvy_score']
-        
-        if age < 30:
-            age_group = "Young"
-        elif age < 50:
-            age_group = "Middle-aged"
-        else:
-            age_group = "Mature"
-            
-        if income > 75000:
-            income_level = "High-income"
-        elif income > 45000:
-            income_level = "Mid-income"
-        else:
-            income_level = "Budget-conscious"
-            
-        if digital > 7:
-            tech_level = "Tech-savvy"
-        elif digital > 4:
-            tech_level = "Moderate-tech"
-        else:
-            tech_level = "Traditional"
-            
-        return f"{age_group} {income_level} {tech_level}"
+        return _segment_names(np.array([profile['avg_age']]), np.array([profile['avg_income']]),
+                              np.array([profile['digital_savvy_score']]))[0]
     
     def get_segment_recommendations(self, segment_id: int) -> Dict[str, Any]:
         """Get marketing recommendations for a specific segment."""
@@ -173,64 +327,23 @@ class DataAnalyzer:
     
     def _recommend_channels(self, profile: Dict[str, Any]) -> List[str]:
         """Recommend marketing channels based on segment profile."""
-        channels = []
-        
-        if profile['digital_savvy_score'] > 6:
-            channels.extend(['Social Media', 'Email Marketing', 'Online Ads'])
-        if profile['avg_age'] < 35:
-            channels.extend(['Instagram', 'TikTok', 'YouTube'])
-        if profile['avg_income'] > 60000:
-            channels.extend(['Premium Publications', 'LinkedIn'])
-        if profile['digital_savvy_score'] < 5:
-            channels.extend(['Traditional Media', 'Print Ads', 'Radio'])
-            
-        return list(set(channels))
+        digital = profile['digital_savvy_score']
+        return list(_channels(bool(digital > 6), bool(digital < 5), bool(profile['avg_age'] < 35),
+                              bool(profile['avg_income'] > 60000)))
     
     def _recommend_campaign_types(self, profile: Dict[str, Any]) -> List[str]:
         """Recommend campaign types based on segment profile."""
-        campaigns = []
-        
-        if profile['brand_loyalty_score'] > 0.7:
-            campaigns.append('Loyalty Program')
-        if profile['avg_spending_score'] > 70:
-            campaigns.append('Premium Product Launch')
-        if profile['avg_age'] < 30:
-            campaigns.append('Trend-focused Campaign')
-        if profile['digital_savvy_score'] > 7:
-            campaigns.append('Interactive Digital Campaign')
-            
-        return campaigns
+        return list(_campaign_types(bool(profile['brand_loyalty_score'] > 0.7), bool(profile['avg_spending_score'] > 70),
+                                    bool(profile['avg_age'] < 30), bool(profile['digital_savvy_score'] > 7)))
     
     def _recommend_messaging_tone(self, profile: Dict[str, Any]) -> str:
         """Recommend messaging tone based on segment profile."""
-        if profile['avg_age'] < 30:
-            return "Casual and trendy"
-        elif profile['avg_income'] > 75000:
-            return "Professional and sophisticated"
-        elif profile['digital_savvy_score'] > 7:
-            return "Tech-forward and innovative"
-        else:
-            return "Friendly and trustworthy"
+        return _messaging_tone(bool(profile['avg_age'] < 30), bool(profile['avg_income'] > 75000),
+                               bool(profile['digital_savvy_score'] > 7))
     
     def _recommend_budget_allocation(self, profile: Dict[str, Any]) -> Dict[str, float]:
         """Recommend budget allocation based on segment profile."""
-        base_allocation = {
-            'Digital': 0.4,
-            'Traditional': 0.3,
-            'Content Creation': 0.2,
-            'Analytics': 0.1
-        }
-        
-        if profile['digital_savvy_score'] > 7:
-            base_allocation['Digital'] += 0.2
-            base_allocation['Traditional'] -= 0.2
-        
-        if profile['avg_age'] < 30:
-            base_allocation['Content Creation'] += 0.1
-            base_allocation['Analytics'] += 0.1
-            base_allocation['Traditional'] -= 0.2
-            
-        return base_allocation
+        return dict(_budget_allocation(float(profile['digital_savvy_score']), float(profile['avg_age'])))
     
     def create_segment_visualization(self) -> Dict[str, Any]:
         """Create visualizations for customer segments."""
@@ -4,31 +4,67 @@ Data processing and customer segmentation module for BrandGen
 
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Any, Optional
 import json
 import os
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
 import logging
 
+from src.config import Config
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Insight age ranges as (label, lowest age, highest age), both ends inclusive
+_AGE_RANGE_LABELS = ('18-25', '26-35', '36-45', '46+')
+_AGE_RANGE_LOWS = np.array([18, 26, 36, 46])
+_AGE_RANGE_HIGHS = np.array([25, 35, 45, np.inf])
+
+# Columns that identify a customer; the first one present is used to detect duplicates
+KEY_COLUMN_CANDIDATES = ('customer_id', 'id', 'user_id', 'email')
+
+# Above this many rows, segmentation switches from full KMeans to MiniBatchKMeans
+MINIBATCH_THRESHOLD = 50_000
+
+# Largest category count one-hot encoded through an identity-matrix gather
+_EYE_MAX_CATEGORIES = 256
+
+def _one_hot(column: pd.Series) -> np.ndarray:
+    """One-hot encode a column as float32, one column per sorted category (missing values encode as all zeros)"""
+    categorical = column.astype('category').cat
+    codes = categorical.codes.to_numpy()
+    n_categories = len(categorical.categories)
+    
+    if n_categories <= _EYE_MAX_CATEGORIES:
+        # The extra all-zero last row is what code -1 (missing) gathers
+        return np.eye(n_categories + 1, n_categories, dtype=np.float32).take(codes, axis=0)
+    
+    encoded = np.zeros((len(codes), n_categories), dtype=np.float32)
+    rows = np.flatnonzero(codes >= 0)
+    encoded[rows, codes[rows]] = 1.0
+    return encoded
+
 class DataProcessor:
     """Handles data processing, analysis, and customer segmentation"""
     
     def __init__(self):
         self.data: Optional[pd.DataFrame] = None
         self.segments: Optional[Dict[str, pd.DataFrame]] = None
-        self.scaler = StandardScaler()
+        # Frame clean_data left free of duplicate rows, so insights can skip re-checking it
+        self._deduplicated_data: Optional[pd.DataFrame] = None
+        # Scaler fitted by the last segmentation
+        self.scaler: Optional[Any] = None
+        # One row per segment summarising each feature, from the last segmentation
+        self.segment_table: Optional[pd.DataFrame] = None
         
-    def load_data(self, file_path: str) -> pd.DataFrame:
+    def load_data(self, file_path: str, usecols: Optional[List[str]] = None) -> pd.DataFrame:
         """
         Load customer data from various file formats
         
         Args:
             file_path: Path to the data file
+            usecols: Optional subset of columns to load
             
         Returns:
             Loaded DataFrame
@@ -37,11 +73,13 @@ class DataProcessor:
             file_extension = os.path.splitext(file_path)[1].lower()
             
             if file_extension == '.csv':
-                self.data = pd.read_csv(file_path)
+                self.data = self._read_csv(file_path, usecols)
             elif file_extension in ['.xlsx', '.xls']:
-                self.data = pd.read_excel(file_path)
+                self.data = pd.read_excel(file_path, usecols=usecols)
             elif file_extension == '.json':
                 self.data = pd.read_json(file_path)
+                if usecols is not None:
+                    self.data = self.data[usecols]
             else:
                 raise ValueError(f"Unsupported file format: {file_extension}")
                 
@@ -52,6 +90,26 @@ class DataProcessor:
             logger.error(f"Error loading data: {str(e)}")
             raise
     
+    def _read_csv(self, file_path: str, usecols: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read a CSV with the configured engine, returning the columns the C parser would"""
+        if Config.CSV_ENGINE != 'c':
+            try:
+                # pyarrow's multithreaded parser; columns stay NumPy-backed for the steps below
+                data = pd.read_csv(file_path, engine=Config.CSV_ENGINE, usecols=usecols)
+                # pyarrow parses ISO dates and times the C parser leaves as strings (into timestamps,
+                # or date/time objects), so re-read those columns as text
+                parsed_columns = [col for col, dtype in data.dtypes.items() if dtype == object or dtype.kind == 'M']
+                if parsed_columns:
+                    text = pd.read_csv(file_path, engine=Config.CSV_ENGINE, usecols=parsed_columns,
+                                       dtype={col: str for col in parsed_columns})
+                    for col in parsed_columns:
+                        data[col] = text[col]
+                return data
+            except ValueError:
+                # Rows the pyarrow reader rejects (e.g. ragged lines) fall back to the C parser
+                pass
+        return pd.read_csv(file_path, usecols=usecols)
+    
     def clean_data(self) -> pd.DataFrame:
         """
         Clean and preprocess the data
@@ -62,24 +120,44 @@ class DataProcessor:
         if self.data is None:
             raise ValueError("No data loaded. Please load data first.")
         
-        # Remove duplicates
+        # Remove duplicates, hashing only the customer key column when there is one
         initial_rows = len(self.data)
-        self.data = self.data.drop_duplicates()
+        key_columns = [col for col in KEY_COLUMN_CANDIDATES if col in self.data.columns]
+        if key_columns:
+            self.data = self.data.drop_duplicates(subset=key_columns[:1], keep='first')
+        else:
+            self.data = self.data.drop_duplicates()
         logger.info(f"Removed {initial_rows - len(self.data)} duplicate rows")
         
-        # Handle missing values
+        # Handle missing values, computing fills only for the columns that have gaps
         numeric_columns = self.data.select_dtypes(include=[np.number]).columns
         categorical_columns = self.data.select_dtypes(include=['object']).columns
+        has_missing = self.data.isna().any()
+        numeric_missing = numeric_columns[has_missing[numeric_columns].to_numpy()]
+        categorical_missing = categorical_columns[has_missing[categorical_columns].to_numpy()]
+        
+        # Filling missing values can make rows equal again; only a fill-free pass stays deduplicated
+        fills_values = len(numeric_missing) > 0 or len(categorical_missing) > 0
         
         # Fill numeric missing values with median
-        for col in numeric_columns:
-            if self.data[col].isnull().any():
-                self.data[col].fillna(self.data[col].median(), inplace=True)
+        if len(numeric_missing) > 0:
+            medians = self.data[numeric_missing].median()
+            self.data[numeric_missing] = self.data[numeric_missing].fillna(medians)
         
-        # Fill categorical missing values with mode
-        for col in categorical_columns:
-            if self.data[col].isnull().any():
-                self.data[col].fillna(self.data[col].mode()[0] if len(self.data[col].mode()) > 0 else 'Unknown', inplace=True)
+        # Fill categorical missing values with mode ('Unknown' for columns with no values at all)
+        if len(categorical_missing) > 0:
+            modes = self.data[categorical_missing].mode()
+            fill_values = modes.iloc[0] if len(modes) > 0 else pd.Series(index=categorical_missing, dtype=object)
+            self.data[categorical_missing] = self.data[categorical_missing].fillna(fill_values.fillna('Unknown'))
+        
+        if len(categorical_columns) > 0:
+            # Store low-cardinality text columns as categoricals so later grouping works on codes
+            unique_counts = self.data[categorical_columns].nunique()
+            low_cardinality = unique_counts.index[unique_counts < 0.5 * len(self.data)]
+            for col in low_cardinality:
+                self.data[col] = self.data[col].astype('category')
+        
+        self._deduplicated_data = None if fills_values else self.data
         
         logger.info("Data cleaning completed")
         return self.data
@@ -98,33 +176,52 @@ class DataProcessor:
         if self.data is None:
             raise ValueError("No data loaded. Please load data first.")
         
+        # sklearn (and scipy under it) is only imported once clustering is needed
+        from sklearn.cluster import KMeans, MiniBatchKMeans
+        from sklearn.preprocessing import StandardScaler
+        
         try:
-            # Prepare features for clustering
-            feature_data = self.data[features].copy()
+            # Prepare features for clustering, reading columns straight from self.data
+            feature_dtypes = self.data.dtypes[features]
+            categorical_features = [col for col, dtype in feature_dtypes.items()
+                                    if dtype == object or isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype))]
+            numeric_features = [col for col in features if col not in categorical_features]
             
-            # Handle categorical variables
-            categorical_features = feature_data.select_dtypes(include=['object']).columns
-            for col in categorical_features:
-                feature_data = pd.get_dummies(feature_data, columns=[col], prefix=col)
+            # Handle categorical variables: numeric block first, then one-hot blocks (get_dummies layout)
+            numeric_block = self.data[numeric_features].to_numpy(dtype=np.float32)
+            if categorical_features:
+                feature_matrix = np.hstack([numeric_block] + [_one_hot(self.data[col]) for col in categorical_features])
+            else:
+                # float32 columns convert as views; the in-place scaler must not write through to self.data
+                feature_matrix = np.ascontiguousarray(numeric_block)
+                if np.may_share_memory(feature_matrix, self.data[features[0]].to_numpy()):
+                    feature_matrix = feature_matrix.copy()
             
-            # Scale features
-            scaled_features = self.scaler.fit_transform(feature_data)
+            # Scale features (float32 halves the memory traffic of the distance computations);
+            # unit-variance scaling only, since centering doesn't change K-means distances
+            self.scaler = StandardScaler(with_mean=False, copy=False)
+            scaled_features = self.scaler.fit_transform(feature_matrix)
             
-            # Perform K-means clustering
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+            # Perform K-means clustering (mini-batches for large tables)
+            if len(self.data) > MINIBATCH_THRESHOLD:
+                kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, batch_size=4096,
+                                         n_init=3, max_iter=100)
+            else:
+                kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10, algorithm='elkan')
             clusters = kmeans.fit_predict(scaled_features)
             
             # Add cluster labels to original data
             self.data['segment'] = clusters
             
-            # Create segment analysis
+            # Create segment analysis from grouped aggregates
+            sizes = np.bincount(clusters, minlength=n_clusters).tolist()
+            characteristics, self.segment_table = self._analyze_segments(features, n_clusters)
             segment_analysis = {}
             for i in range(n_clusters):
-                segment_data = self.data[self.data['segment'] == i]
                 segment_analysis[f'Segment_{i}'] = {
-                    'size': len(segment_data),
-                    'percentage': round(len(segment_data) / len(self.data) * 100, 2),
-                    'characteristics': self._analyze_segment(segment_data, features)
+                    'size': sizes[i],
+                    'percentage': round(sizes[i] / len(self.data) * 100, 2),
+                    'characteristics': characteristics[i]
                 }
             
             logger.info(f"Customer segmentation completed with {n_clusters} segments")
@@ -138,34 +235,79 @@ class DataProcessor:
             logger.error(f"Error in customer segmentation: {str(e)}")
             raise
     
-    def _analyze_segment(self, segment_data: pd.DataFrame, features: List[str]) -> Dict[str, Any]:
+    def _analyze_segments(self, features: List[str],
+                          n_clusters: int) -> Tuple[Dict[int, Dict[str, Any]], pd.DataFrame]:
         """
-        Analyze characteristics of a customer segment
+        Analyze characteristics of every customer segment
+        
+        All statistics are computed in grouped passes over the data; this
+        method then only shapes them into one dictionary per segment and a
+        segment x feature table.
         
         Args:
-            segment_data: DataFrame containing segment data
             features: List of features used for segmentation
+            n_clusters: Number of segments
             
         Returns:
-            Dictionary containing segment characteristics
+            Dictionary mapping segment id to its characteristics, and a table
+            with the mean (numeric) or mode (other) of each feature per segment
         """
-        characteristics = {}
+        features = [feature for feature in features if feature in self.data.columns]
+        numeric_features = [feature for feature in features if self.data[feature].dtype in ['int64', 'float64']]
+        other_features = [feature for feature in features if feature not in numeric_features]
+        grouped = self.data.groupby('segment', sort=False)
         
-        for feature in features:
-            if feature in segment_data.columns:
-                if segment_data[feature].dtype in ['int64', 'float64']:
+        # mean/median/std of every numeric feature for every segment at once, as a
+        # (segment, feature, statistic) tensor; segments without rows are all NaN
+        numeric_stats = None
+        if numeric_features:
+            numeric_stats = (grouped[numeric_features].agg(['mean', 'median', 'std']).round(2)
+                             .reindex(range(n_clusters)).to_numpy()
+                             .reshape(n_clusters, len(numeric_features), 3))
+        
+        # Value counts and distinct counts for the remaining features
+        value_counts = {}
+        unique_counts = {}
+        for feature in other_features:
+            counts = grouped[feature].value_counts()
+            value_counts[feature] = counts[counts > 0]
+            unique_counts[feature] = grouped[feature].nunique()
+        
+        analysis = {}
+        for i in range(n_clusters):
+            characteristics = {}
+            for feature in features:
+                if feature in numeric_features:
+                    stats = numeric_stats[i, numeric_features.index(feature)]
                     characteristics[feature] = {
-                        'mean': round(segment_data[feature].mean(), 2),
-                        'median': round(segment_data[feature].median(), 2),
-                        'std': round(segment_data[feature].std(), 2)
+                        'mean': stats[0],
+                        'median': stats[1],
+                        'std': stats[2]
                     }
                 else:
+                    counts = value_counts[feature]
+                    segment_counts = counts.xs(i, level=0) if i in counts.index.get_level_values(0) else counts.iloc[0:0]
                     characteristics[feature] = {
-                        'mode': segment_data[feature].mode().iloc[0] if len(segment_data[feature].mode()) > 0 else 'N/A',
-                        'unique_values': segment_data[feature].nunique()
+                        'mode': self._mode_from_counts(segment_counts),
+                        'unique_values': int(unique_counts[feature].get(i, 0))
                     }
+            analysis[i] = characteristics
+        
+        # Numeric means come straight out of the grouped tensor as whole columns
+        table = pd.DataFrame({
+            (f"{feature} (avg)" if feature in numeric_features else f"{feature} (most common)"):
+                (numeric_stats[:, numeric_features.index(feature), 0] if feature in numeric_features
+                 else [analysis[i][feature]['mode'] for i in range(n_clusters)])
+            for feature in features
+        }, index=pd.Index([f'Segment_{i}' for i in range(n_clusters)], name='Segment'))
         
-        return characteristics
+        return analysis, table
+    
+    def _mode_from_counts(self, counts: pd.Series) -> Any:
+        """Most frequent value in a value_counts() result (smallest on ties, as Series.mode), or 'N/A'"""
+        if len(counts) == 0:
+            return 'N/A'
+        return counts.index[counts.to_numpy() == counts.max()].sort_values()[0]
     
     def generate_insights(self) -> Dict[str, Any]:
         """
@@ -180,27 +322,25 @@ class DataProcessor:
         insights = {
             'total_customers': len(self.data),
             'data_quality': {
-                'missing_values': self.data.isnull().sum().sum(),
-                'duplicate_rows': self.data.duplicated().sum()
+                'missing_values': int(np.count_nonzero(self.data.isna().to_numpy())),
+                'duplicate_rows': 0 if self._deduplicated_data is self.data else int(self.data.duplicated().sum())
             },
-            'summary_stats': self.data.describe(include='all').to_dict()
+            'summary_stats': self._summary_stats()
         }
         
         # Age distribution if age column exists
         if 'age' in self.data.columns:
             insights['age_distribution'] = {
                 'mean_age': round(self.data['age'].mean(), 1),
-                'age_ranges': {
-                    '18-25': len(self.data[(self.data['age'] >= 18) & (self.data['age'] <= 25)]),
-                    '26-35': len(self.data[(self.data['age'] >= 26) & (self.data['age'] <= 35)]),
-                    '36-45': len(self.data[(self.data['age'] >= 36) & (self.data['age'] <= 45)]),
-                    '46+': len(self.data[self.data['age'] >= 46])
-                }
+                'age_ranges': self._count_age_ranges(self.data['age'])
             }
         
         # Gender distribution if gender column exists
         if 'gender' in self.data.columns:
-            insights['gender_distribution'] = self.data['gender'].value_counts().to_dict()
+            gender_counts = self.data['gender'].value_counts()
+            insights['gender_distribution'] = gender_counts.to_dict()
+            if len(gender_counts) > 0:
+                insights['primary_gender'] = gender_counts.idxmax()
         
         # Location distribution if location column exists
         if 'location' in self.data.columns:
@@ -208,6 +348,56 @@ class DataProcessor:
         
         return insights
     
+    def _summary_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize each column without the quantile sorts of describe()
+        
+        Returns:
+            Per-column statistics: count/mean/std/min/max for numeric columns,
+            count/unique/top/freq for the others
+        """
+        numeric_columns = self.data.select_dtypes(include=[np.number]).columns
+        # agg() has nothing to concatenate on a frame without numeric columns
+        numeric_stats = (self.data[numeric_columns].agg(['count', 'mean', 'std', 'min', 'max']).to_dict()
+                         if len(numeric_columns) else {})
+        
+        summary = {}
+        for col in self.data.columns:
+            if col in numeric_stats:
+                summary[col] = numeric_stats[col]
+                continue
+            
+            # One value_counts pass gives the distinct count, top value and its frequency
+            counts = self.data[col].value_counts()
+            counts = counts[counts > 0]
+            summary[col] = {
+                'count': int(self.data[col].count()),
+                'unique': len(counts),
+                'top': counts.index[0] if len(counts) > 0 else np.nan,
+                'freq': int(counts.iloc[0]) if len(counts) > 0 else np.nan
+            }
+        
+        return summary
+    
+    def _count_age_ranges(self, ages: pd.Series) -> Dict[str, int]:
+        """
+        Count customers per insight age range in a single bucketing pass
+        
+        Args:
+            ages: Customer ages
+            
+        Returns:
+            Dictionary mapping each age range label to its customer count
+        """
+        values = ages.to_numpy(dtype=np.float64, na_value=np.nan)
+        
+        # Bucket by lower bound, then drop ages in the gaps between ranges (e.g. 25.5)
+        buckets = np.searchsorted(_AGE_RANGE_LOWS, values, side='right') - 1
+        in_range = (buckets >= 0) & (values <= _AGE_RANGE_HIGHS[np.maximum(buckets, 0)])
+        counts = np.bincount(buckets[in_range], minlength=len(_AGE_RANGE_LABELS))
+        
+        return dict(zip(_AGE_RANGE_LABELS, counts.tolist()))
+    
     def export_segments(self, output_dir: str = "data/segments") -> List[str]:
         """
         Export customer segments to separate CSV files
@@ -222,14 +412,31 @@ class DataProcessor:
             raise ValueError("No segmented data available. Please perform segmentation first.")
         
         os.makedirs(output_dir, exist_ok=True)
-        exported_files = []
-        
-        for segment_id in self.data['segment'].unique():
-            segment_data = self.data[self.data['segment'] == segment_id]
-            filename = f"segment_{segment_id}.csv"
-            filepath = os.path.join(output_dir, filename)
-            segment_data.to_csv(filepath, index=False)
-            exported_files.append(filepath)
+        
+        groups = list(self.data.groupby('segment', sort=False))
+        filepaths = [os.path.join(output_dir, f"segment_{segment_id}.csv") for segment_id, _ in groups]
+        
+        # Write the segment files in parallel, each with the same to_csv output as a serial export
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(groups)))) as executor:
+            exported_files = list(executor.map(self._write_segment_csv,
+                                               [segment_data for _, segment_data in groups],
+                                               filepaths))
+        
+        for (segment_id, _), filepath in zip(groups, exported_files):
             logger.info(f"Exported segment {segment_id} to {filepath}")
         
         return exported_files
+    
+    def _write_segment_csv(self, segment_data: pd.DataFrame, filepath: str) -> str:
+        """
+        Write one segment to a CSV file
+        
+        Args:
+            segment_data: DataFrame containing segment data
+            filepath: Output file path
+            
+        Returns:
+            Path to the written file
+        """
+        segment_data.to_csv(filepath, index=False)
+        return filepath
@@ -2,14 +2,15 @@
 AI Image Generation module using OpenAI DALL-E API
 """
 
-import openai
-import requests
-from PIL import Image
+import asyncio
+import bisect
+import hashlib
 import io
 import os
 import json
-from typing import List, Dict, Any, Optional, Tuple
-import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, List, Dict, Any, Optional, Tuple
 import logging
 from datetime import datetime
 
@@ -19,28 +20,111 @@ from src.config import Config
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# File signatures of the formats save_image can write without re-encoding
+_IMAGE_SIGNATURES = {
+    '.png': b'\x89PNG\r\n\x1a\n',
+    '.jpg': b'\xff\xd8\xff',
+    '.jpeg': b'\xff\xd8\xff'
+}
+
+# Audience labels by mean segment age: below 25, below 35, below 50, 50 and over
+_AGE_BINS = (25, 35, 50)
+_AGE_LABELS = ("young adults (18-25) ", "millennials (25-35) ",
+               "middle-aged professionals (35-50) ", "mature adults (50+) ")
+
+# Images a single generation request can return, by model (dall-e-3 only supports n=1)
+_IMAGES_PER_REQUEST = {"dall-e-2": 10}
+
+class _RequestPacer:
+    """Spaces out API request start times by a minimum interval"""
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def wait(self) -> None:
+        """Wait until the next request slot is free, then claim it"""
+        if self.interval <= 0:
+            return
+        
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        
+        if start > now:
+            await asyncio.sleep(start - now)
+
+@lru_cache(maxsize=None)
+def _get_openai_client(api_key: str) -> Any:
+    """Return the shared OpenAI client for an API key, importing openai on first use"""
+    import openai
+    return openai.OpenAI(api_key=api_key)
+
+@lru_cache(maxsize=None)
+def _get_download_executor() -> ThreadPoolExecutor:
+    """Return the worker threads shared by every generator's image downloads"""
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="image-download")
+
+def _run_coroutine(coroutine: Any) -> Any:
+    """Run a coroutine to completion, on a worker thread if this thread already runs an event loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    
+    # asyncio.run can't nest inside a running loop (e.g. Jupyter), so give the batch its own loop and thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
 class ImageGenerator:
     """Handles AI image generation using OpenAI DALL-E API"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 cache_dir: Optional[str] = None,
+                 max_cache_entries: int = 128):
         """
         Initialize the ImageGenerator
         
         Args:
             api_key: OpenAI API key (optional, will use config if not provided)
+            cache_dir: Directory caching generated images by request (None, the default, disables the cache)
+            max_cache_entries: Most images kept in the cache; the least recently used are evicted
         """
         self.config = Config()
         self.api_key = api_key or self.config.OPENAI_API_KEY
         if not self.api_key:
             raise ValueError("OpenAI API key not provided. Please set OPENAI_API_KEY in your environment.")
         
-        # Initialize OpenAI client
-        openai.api_key = self.api_key
-        self.client = openai
+        # Keep-alive HTTP session for image downloads, opened on the first download and released by close()
+        self._session = None
         
         # Image generation history
         self.generation_history: List[Dict[str, Any]] = []
         
+        # Generated images are reused for identical requests when a cache directory is given
+        self.cache_dir = cache_dir
+        self.max_cache_entries = max_cache_entries
+    
+    @property
+    def client(self) -> Any:
+        """OpenAI client, created on first use"""
+        return _get_openai_client(self.api_key)
+    
+    def close(self) -> None:
+        """Close the download session; a later download opens a new one"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+    
+    def __enter__(self) -> "ImageGenerator":
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+        
     def create_marketing_prompt(self, 
                               product: str,
                               target_audience: str,
@@ -86,45 +170,41 @@ class ImageGenerator:
         """
         prompts = []
         
+        style = campaign_data.get('style', 'modern')
+        product = campaign_data.get('product', 'product')
+        mood = campaign_data.get('mood', 'professional')
+        
         for segment_name, segment_info in segment_data.items():
             # Extract segment characteristics
             characteristics = segment_info.get('characteristics', {})
             
-            # Build personalized prompt
-            prompt = f"Create a {campaign_data.get('style', 'modern')} marketing image for "
-            prompt += f"{campaign_data.get('product', 'product')} targeting "
-            
             # Add demographic information
+            age = ""
             if 'age' in characteristics:
                 age_mean = characteristics['age'].get('mean', 30)
-                if age_mean < 25:
-                    prompt += "young adults (18-25) "
-                elif age_mean < 35:
-                    prompt += "millennials (25-35) "
-                elif age_mean < 50:
-                    prompt += "middle-aged professionals (35-50) "
-                else:
-                    prompt += "mature adults (50+) "
+                age = _AGE_LABELS[bisect.bisect_right(_AGE_BINS, age_mean)]
             
+            gender = ""
             if 'gender' in characteristics:
                 gender_mode = characteristics['gender'].get('mode', 'diverse')
                 if gender_mode.lower() in ['male', 'female']:
-                    prompt += f"primarily {gender_mode.lower()} audience "
+                    gender = f"primarily {gender_mode.lower()} audience "
                 else:
-                    prompt += "diverse audience "
+                    gender = "diverse audience "
             
             # Add interest-based elements
+            interests = ""
             if 'interests' in characteristics:
                 interest_mode = characteristics['interests'].get('mode', '')
                 if interest_mode:
-                    prompt += f"with interests in {interest_mode} "
-            
-            # Add style and mood
-            prompt += f". Style: {campaign_data.get('style', 'modern')}, "
-            prompt += f"Mood: {campaign_data.get('mood', 'professional')}. "
-            prompt += "High quality, professional, suitable for digital marketing."
+                    interests = f"with interests in {interest_mode} "
             
-            prompts.append(prompt)
+            # Build personalized prompt with style and mood
+            prompts.append(
+                f"Create a {style} marketing image for {product} targeting {age}{gender}{interests}"
+                f". Style: {style}, Mood: {mood}. "
+                "High quality, professional, suitable for digital marketing."
+            )
         
         return prompts
     
@@ -133,7 +213,8 @@ class ImageGenerator:
                       size: str = "1024x1024",
                       quality: str = "standard",
                       style: str = "vivid",
-                      model: str = "dall-e-3") -> Dict[str, Any]:
+                      model: str = "dall-e-3",
+                      refresh: bool = False) -> Dict[str, Any]:
         """
         Generate a single image using DALL-E
         
@@ -143,10 +224,17 @@ class ImageGenerator:
             quality: Image quality (standard, hd)
             style: Image style (vivid, natural)
             model: DALL-E model to use
+            refresh: Generate a new image even if one is cached, replacing the cached copy
             
         Returns:
             Dictionary containing image data and metadata
         """
+        cache_key = self._cache_key(prompt, size, quality, style, model)
+        cached = None if refresh else self._load_cached_result(cache_key)
+        if cached is not None:
+            self._record_history(cached)
+            return cached
+        
         try:
             logger.info(f"Generating image with prompt: {prompt[:100]}...")
             
@@ -166,76 +254,319 @@ class ImageGenerator:
             # Download image
             image_data = self._download_image(image_url)
             
-            # Create result dictionary
-            result = {
-                'success': True,
-                'image_data': image_data,
-                'image_url': image_url,
-                'prompt': prompt,
-                'size': size,
-                'quality': quality,
-                'style': style,
-                'model': model,
-                'timestamp': datetime.now().isoformat(),
-                'revised_prompt': getattr(response.data[0], 'revised_prompt', prompt)
-            }
-            
-            # Add to history
-            self.generation_history.append(result)
+            # Create result dictionary and add to history
+            result = self._build_result(response, image_data, prompt, size, quality, style, model)
+            self._record_history(result)
+            self._store_cached_result(cache_key, result)
             
             logger.info("Image generated successfully")
             return result
             
         except Exception as e:
             logger.error(f"Error generating image: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e),
-                'prompt': prompt,
-                'timestamp': datetime.now().isoformat()
-            }
+            return self._build_error_result(e, prompt)
+    
+    def _build_result(self,
+                      response: Any,
+                      image_data: bytes,
+                      prompt: str,
+                      size: str,
+                      quality: str,
+                      style: str,
+                      model: str,
+                      index: int = 0) -> Dict[str, Any]:
+        """Build the result dictionary for a successful generation (image `index` of the response)"""
+        return {
+            'success': True,
+            'image_data': image_data,
+            'image_url': response.data[index].url,
+            'prompt': prompt,
+            'size': size,
+            'quality': quality,
+            'style': style,
+            'model': model,
+            'timestamp': datetime.now().isoformat(),
+            'revised_prompt': getattr(response.data[index], 'revised_prompt', prompt)
+        }
+    
+    def _record_history(self, result: Dict[str, Any]) -> None:
+        """Add a generation to the history, keeping metadata only (no image bytes)"""
+        self.generation_history.append({key: value for key, value in result.items() if key != 'image_data'})
+    
+    def _build_error_result(self, error: Exception, prompt: str) -> Dict[str, Any]:
+        """Build the result dictionary for a failed generation"""
+        return {
+            'success': False,
+            'error': str(error),
+            'prompt': prompt,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    async def _generate_images_async(self,
+                                     client: Any,
+                                     semaphore: asyncio.Semaphore,
+                                     pacer: _RequestPacer,
+                                     prompt: str,
+                                     size: str,
+                                     quality: str,
+                                     style: str,
+                                     model: str = "dall-e-3",
+                                     n: int = 1,
+                                     max_retries: int = 3,
+                                     refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Generate n images for one prompt with a single request on an async OpenAI client
+        
+        Args:
+            client: AsyncOpenAI client shared by the batch
+            semaphore: Semaphore bounding the number of in-flight requests
+            pacer: Rate limiter spacing out request starts
+            prompt: Text prompt for image generation
+            size: Image size
+            quality: Image quality
+            style: Image style
+            model: DALL-E model to use
+            n: Number of images to request (more than 1 only for models that support it)
+            max_retries: Retries with exponential backoff when rate limited
+            refresh: Skip the cache lookup and replace the cached copy
+            
+        Returns:
+            List of n dictionaries containing image data and metadata
+        """
+        # The cache holds one image per request, so it can only serve single-image requests
+        cache_key = self._cache_key(prompt, size, quality, style, model)
+        cached = self._load_cached_result(cache_key) if n == 1 and not refresh else None
+        if cached is not None:
+            self._record_history(cached)
+            return [cached]
+        
+        import openai
+        
+        async with semaphore:
+            try:
+                logger.info(f"Generating image with prompt: {prompt[:100]}...")
+                
+                for attempt in range(max_retries + 1):
+                    await pacer.wait()
+                    try:
+                        response = await client.images.generate(
+                            model=model,
+                            prompt=prompt,
+                            size=size,
+                            quality=quality,
+                            style=style,
+                            n=n
+                        )
+                        break
+                    except openai.RateLimitError:
+                        if attempt == max_retries:
+                            raise
+                        await asyncio.sleep(2 ** attempt)
+                
+                # Download images without blocking the event loop
+                loop = asyncio.get_running_loop()
+                images = await asyncio.gather(*(
+                    loop.run_in_executor(_get_download_executor(), self._download_image, image.url)
+                    for image in response.data
+                ))
+                
+                results = [
+                    self._build_result(response, image_data, prompt, size, quality, style, model, index)
+                    for index, image_data in enumerate(images)
+                ]
+                for result in results:
+                    self._record_history(result)
+                self._store_cached_result(cache_key, results[0])
+                
+                logger.info(f"Generated {len(results)} image(s) successfully")
+                return results
+                
+            except Exception as e:
+                logger.error(f"Error generating image: {str(e)}")
+                return [self._build_error_result(e, prompt) for _ in range(n)]
+    
+    def _cache_key(self, prompt: str, size: str, quality: str, style: str, model: str) -> str:
+        """Hash the generation request into a cache key"""
+        request = json.dumps({'prompt': prompt, 'size': size, 'quality': quality, 'style': style, 'model': model},
+                             sort_keys=True)
+        return hashlib.blake2b(request.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _load_cached_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for a request key, or None on a miss"""
+        if self.cache_dir is None:
+            return None
+        
+        try:
+            with open(os.path.join(self.cache_dir, f"{cache_key}.json")) as f:
+                metadata = json.load(f)
+            with open(os.path.join(self.cache_dir, f"{cache_key}.png"), 'rb') as f:
+                image_data = f.read()
+        except (OSError, ValueError):
+            return None
+        
+        # Mark the entry as recently used so eviction drops colder images first
+        try:
+            os.utime(os.path.join(self.cache_dir, f"{cache_key}.json"))
+        except OSError:
+            pass
+        
+        logger.info(f"Using cached image for prompt: {metadata.get('prompt', '')[:100]}...")
+        # The original image URL expires shortly after generation, so cached results only carry the bytes
+        return {**metadata, 'image_data': image_data, 'image_url': None, 'cached': True,
+                'timestamp': datetime.now().isoformat()}
+    
+    def _store_cached_result(self, cache_key: str, result: Dict[str, Any]) -> None:
+        """Cache a successful result's image and metadata under its request key"""
+        if self.cache_dir is None:
+            return
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(os.path.join(self.cache_dir, f"{cache_key}.png"), 'wb') as f:
+                f.write(result['image_data'])
+            # Metadata last, so an interrupted write never looks like a hit
+            with open(os.path.join(self.cache_dir, f"{cache_key}.json"), 'w') as f:
+                json.dump({key: value for key, value in result.items() if key not in ('image_data', 'image_url')},
+                          f, default=str)
+            self._evict_cached_results()
+        except OSError as e:
+            logger.warning(f"Could not cache generated image: {str(e)}")
+    
+    def _evict_cached_results(self) -> None:
+        """Remove the least recently used cache entries beyond max_cache_entries"""
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.json')]
+        if len(entries) <= self.max_cache_entries:
+            return
+        
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_cache_entries]:
+            cache_key = entry.name[:-len('.json')]
+            for suffix in ('.json', '.png'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, f"{cache_key}{suffix}"))
+                except OSError:
+                    pass
+    
+    def generate_batch_concurrent(self,
+                                  prompts: List[str],
+                                  size: str = "1024x1024",
+                                  quality: str = "standard",
+                                  style: str = "vivid",
+                                  max_concurrency: int = 5,
+                                  min_interval: float = 0.0,
+                                  model: str = "dall-e-3",
+                                  progress_callback: Optional[Callable[[int, int], None]] = None,
+                                  refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Generate multiple images concurrently with bounded parallelism
+        
+        On dall-e-2, identical prompts share requests that return one image
+        per occurrence; other models send one request per prompt, so repeated
+        prompts still get distinct images.
+        
+        Args:
+            prompts: List of prompts for image generation
+            size: Image size
+            quality: Image quality
+            style: Image style
+            max_concurrency: Maximum number of requests in flight at once
+            min_interval: Minimum time between request starts (seconds)
+            model: DALL-E model to use
+            progress_callback: Called as (completed, total) prompts whenever a request finishes
+            refresh: Generate new images even for cached requests, replacing the cached copies
+            
+        Returns:
+            List of generation results, in prompt order
+        """
+        # Prompt positions served by each request: one per prompt, unless the model returns several images
+        # per request, in which case the positions of each distinct prompt are grouped per_request at a time
+        per_request = _IMAGES_PER_REQUEST.get(model, 1)
+        dispatches: List[Tuple[str, List[int]]] = []
+        if per_request == 1:
+            dispatches = [(prompt, [position]) for position, prompt in enumerate(prompts)]
+        else:
+            positions: Dict[str, List[int]] = {}
+            for position, prompt in enumerate(prompts):
+                positions.setdefault(prompt, []).append(position)
+            for prompt, indices in positions.items():
+                dispatches.extend((prompt, indices[start:start + per_request])
+                                  for start in range(0, len(indices), per_request))
+        
+        import openai
+        
+        completed = 0
+        
+        async def run_dispatch(client: Any, semaphore: asyncio.Semaphore, pacer: _RequestPacer,
+                               prompt: str, indices: List[int]) -> List[Dict[str, Any]]:
+            nonlocal completed
+            generated = await self._generate_images_async(client, semaphore, pacer, prompt, size, quality, style,
+                                                          model, n=1 if per_request == 1 else len(indices),
+                                                          refresh=refresh)
+            completed += len(indices)
+            if progress_callback is not None:
+                # Runs between requests on the thread driving the loop: the caller's, unless it already runs a loop
+                progress_callback(completed, len(prompts))
+            return generated
+        
+        async def run_batch() -> List[List[Dict[str, Any]]]:
+            semaphore = asyncio.Semaphore(max_concurrency)
+            pacer = _RequestPacer(min_interval)
+            client = openai.AsyncOpenAI(api_key=self.api_key)
+            try:
+                return await asyncio.gather(*(
+                    run_dispatch(client, semaphore, pacer, prompt, indices)
+                    for prompt, indices in dispatches
+                ))
+            finally:
+                await client.close()
+        
+        logger.info(f"Starting concurrent generation of {len(prompts)} images in {len(dispatches)} requests "
+                    f"(max {max_concurrency} in flight)")
+        results: List[Dict[str, Any]] = [None] * len(prompts)
+        for (_, indices), generated in zip(dispatches, _run_coroutine(run_batch())):
+            for position, result in zip(indices, generated):
+                results[position] = result
+        logger.info(f"Batch generation completed. {sum(1 for r in results if r['success'])} successful generations")
+        return results
     
     def generate_batch(self, 
                       prompts: List[str],
                       size: str = "1024x1024",
                       quality: str = "standard",
                       style: str = "vivid",
-                      delay: float = 1.0) -> List[Dict[str, Any]]:
+                      delay: float = 1.0,
+                      max_concurrency: int = 5,
+                      model: str = "dall-e-3",
+                      refresh: bool = False) -> List[Dict[str, Any]]:
         """
         Generate multiple images in batch with rate limiting
         
+        Requests overlap up to max_concurrency at a time; delay now spaces
+        out request starts instead of pausing between finished requests.
+        
         Args:
             prompts: List of prompts for image generation
             size: Image size
             quality: Image quality
             style: Image style
-            delay: Delay between requests (seconds)
+            delay: Minimum delay between request starts (seconds)
+            max_concurrency: Maximum number of requests in flight at once
+            model: DALL-E model to use
+            refresh: Generate new images even for cached requests
             
         Returns:
             List of generation results
         """
-        results = []
-        
-        logger.info(f"Starting batch generation of {len(prompts)} images")
-        
-        for i, prompt in enumerate(prompts):
-            logger.info(f"Generating image {i+1}/{len(prompts)}")
-            
-            result = self.generate_image(
-                prompt=prompt,
-                size=size,
-                quality=quality,
-                style=style
-            )
-            
-            results.append(result)
-            
-            # Rate limiting
-            if i < len(prompts) - 1:
-                time.sleep(delay)
-        
-        logger.info(f"Batch generation completed. {sum(1 for r in results if r['success'])} successful generations")
-        return results
+        return self.generate_batch_concurrent(
+            prompts=prompts,
+            size=size,
+            quality=quality,
+            style=style,
+            max_concurrency=max_concurrency,
+            min_interval=delay,
+            model=model,
+            refresh=refresh
+        )
     
     def _download_image(self, url: str) -> bytes:
         """
@@ -248,7 +579,10 @@ class ImageGenerator:
             Image data as bytes
         """
         try:
-            response = requests.get(url, timeout=30)
+            if self._session is None:
+                import requests
+                self._session = requests.Session()
+            response = self._session.get(url, timeout=30)
             response.raise_for_status()
             return response.content
         except Exception as e:
@@ -279,9 +613,16 @@ class ImageGenerator:
             
             filepath = os.path.join(output_dir, filename)
             
-            # Save image
-            image = Image.open(io.BytesIO(image_data))
-            image.save(filepath)
+            # Write the bytes as-is when they are already in the target format;
+            # only re-encode through PIL for a format conversion
+            extension = os.path.splitext(filename)[1].lower()
+            if image_data.startswith(_IMAGE_SIGNATURES[extension]):
+                with open(filepath, 'wb') as f:
+                    f.write(image_data)
+            else:
+                from PIL import Image
+                image = Image.open(io.BytesIO(image_data))
+                image.save(filepath)
             
             logger.info(f"Image saved to {filepath}")
             return filepath
@@ -323,7 +664,7 @@ class ImageGenerator:
         return saved_files
     
     def get_generation_history(self) -> List[Dict[str, Any]]:
-        """Get the history of image generations"""
+        """Get the history of image generations (metadata only; image bytes are in the returned results)"""
         return self.generation_history
     
     def export_history(self, filepath: str = "generation_history.json") -> str:
@@ -337,16 +678,9 @@ class ImageGenerator:
             Path to exported file
         """
         try:
-            # Remove binary data for JSON serialization
-            export_data = []
-            for item in self.generation_history:
-                export_item = item.copy()
-                if 'image_data' in export_item:
-                    del export_item['image_data']  # Remove binary data
-                export_data.append(export_item)
-            
+            # History entries carry no binary data, so they serialize as-is
             with open(filepath, 'w') as f:
-                json.dump(export_data, f, indent=2, default=str)
+                json.dump(self.generation_history, f, indent=2, default=str)
             
             logger.info(f"Generation history exported to {filepath}")
             return filepath
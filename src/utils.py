@@ -3,20 +3,188 @@ Utility functions for BrandGen application
 """
 
 import os
+import csv
 import json
-import pandas as pd
-import numpy as np
-from typing import Dict, List, Any, Optional, Union
+import orjson
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, List, Any, Mapping, Optional, Tuple, Union
 import base64
-from PIL import Image
 import io
+import mmap
 import logging
-from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import islice
+
+# pandas, numpy and PIL are imported inside the functions that need them, so
+# the formatting helpers don't pay for them on import
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pre-defined campaign templates, shared read-only by generate_campaign_templates()
+_CAMPAIGN_TEMPLATES = MappingProxyType({
+    "fashion_brand": MappingProxyType({
+        "name": "Fashion Brand Campaign",
+        "product": "Fashion collection",
+        "style": "modern",
+        "mood": "stylish",
+        "target_audience": "fashion-conscious consumers",
+        "additional_elements": ("trendy models", "urban background", "vibrant colors"),
+        "industry": "Fashion",
+        "budget_range": "medium"
+    }),
+    "tech_product": MappingProxyType({
+        "name": "Tech Product Launch",
+        "product": "Tech gadget",
+        "style": "futuristic",
+        "mood": "innovative",
+        "target_audience": "tech enthusiasts",
+        "additional_elements": ("sleek design", "minimalist", "high-tech environment"),
+        "industry": "Technology",
+        "budget_range": "high"
+    }),
+    "food_restaurant": MappingProxyType({
+        "name": "Restaurant Promotion",
+        "product": "Gourmet food",
+        "style": "appetizing",
+        "mood": "warm and inviting",
+        "target_audience": "food lovers",
+        "additional_elements": ("delicious presentation", "cozy atmosphere", "natural lighting"),
+        "industry": "Food & Beverage",
+        "budget_range": "low"
+    }),
+    "fitness_health": MappingProxyType({
+        "name": "Fitness Brand",
+        "product": "Fitness program",
+        "style": "energetic",
+        "mood": "motivational",
+        "target_audience": "fitness enthusiasts",
+        "additional_elements": ("active people", "gym environment", "dynamic poses"),
+        "industry": "Health & Fitness",
+        "budget_range": "medium"
+    }),
+    "luxury_goods": MappingProxyType({
+        "name": "Luxury Brand",
+        "product": "Luxury items",
+        "style": "elegant",
+        "mood": "sophisticated",
+        "target_audience": "affluent consumers",
+        "additional_elements": ("premium materials", "elegant lighting", "refined setting"),
+        "industry": "Luxury",
+        "budget_range": "high"
+    })
+})
+
+# Visualization color palettes by theme
+_COLOR_PALETTES = MappingProxyType({
+    "default": ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f"),
+    "modern": ("#667eea", "#764ba2", "#f093fb", "#f5576c", "#4facfe", "#00f2fe", "#43e97b", "#38f9d7"),
+    "corporate": ("#2c3e50", "#3498db", "#e74c3c", "#f39c12", "#27ae60", "#9b59b6", "#1abc9c", "#34495e"),
+    "vibrant": ("#ff6b6b", "#4ecdc4", "#45b7d1", "#96ceb4", "#feca57", "#ff9ff3", "#54a0ff", "#5f27cd")
+})
+
+# Power BI export metric columns, read from each campaign's overall performance metrics
+_POWERBI_METRIC_COLUMNS = ('engagement_rate', 'click_through_rate', 'conversion_rate',
+                           'cost_per_acquisition', 'return_on_ad_spend')
+
+# Bound formatters for currencies with a symbol; others get the code as a suffix
+_CURRENCY_FORMATTERS = MappingProxyType({
+    "USD": "${:,.2f}".format,
+    "EUR": "€{:,.2f}".format,
+    "GBP": "£{:,.2f}".format
+})
+
+# Images larger than this are base64-encoded from a memory map instead of a read buffer
+_MMAP_THRESHOLD_BYTES = 16 * 1024 * 1024
+
+# Data rows counted after the header when sniffing a CSV or Excel upload
+_SAMPLE_ROWS = 5
+
+def _sniff_rows(rows, empty_message: str) -> tuple:
+    """Take the header and up to _SAMPLE_ROWS data rows from an iterator of non-empty rows"""
+    header = next(rows, None)
+    if not header:
+        return (empty_message,), {}
+    return (), {'columns': tuple(header), 'sample_rows': sum(1 for _ in islice(rows, _SAMPLE_ROWS))}
+
+def _inspect_csv(file_path: str) -> tuple:
+    """Sniff a CSV header and sample rows (csv.reader only, no pandas)"""
+    try:
+        with open(file_path, newline='', encoding='utf-8') as f:
+            return _sniff_rows((row for row in csv.reader(f) if row),
+                               "CSV file appears to be empty or invalid")
+    except Exception as e:
+        return (f"Unable to read CSV file: {str(e)}",), {}
+
+def _inspect_xlsx(file_path: str) -> tuple:
+    """Sniff an xlsx header and sample rows from a read-only workbook"""
+    try:
+        from openpyxl import load_workbook
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(max_row=_SAMPLE_ROWS + 1, values_only=True)
+            return _sniff_rows((row for row in rows if any(value is not None for value in row)),
+                               "Excel file appears to be empty or invalid")
+        finally:
+            workbook.close()
+    except Exception as e:
+        return (f"Unable to read Excel file: {str(e)}",), {}
+
+def _inspect_xls(file_path: str) -> tuple:
+    """Sniff a legacy .xls header and sample rows (openpyxl can't open these, pandas can)"""
+    try:
+        import pandas as pd
+        df = pd.read_excel(file_path, nrows=_SAMPLE_ROWS)
+        if len(df.columns) == 0:
+            return ("Excel file appears to be empty or invalid",), {}
+        return (), {'columns': tuple(df.columns.tolist()), 'sample_rows': len(df)}
+    except Exception as e:
+        return (f"Unable to read Excel file: {str(e)}",), {}
+
+def _inspect_json(file_path: str) -> tuple:
+    """Parse a JSON file fully, so malformed files are still rejected"""
+    try:
+        # orjson parses straight from bytes
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        try:
+            data = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # orjson rejects NaN/Infinity literals and integers wider than 64 bits, which json accepts
+            data = json.loads(content)
+        return (), {'json_type': type(data).__name__}
+    except Exception as e:
+        return (f"Unable to read JSON file: {str(e)}",), {}
+
+# Content checks keyed by upload extension; each returns (errors, file_info entries)
+_CONTENT_INSPECTORS = MappingProxyType({
+    '.csv': _inspect_csv,
+    '.xlsx': _inspect_xlsx,
+    '.xls': _inspect_xls,
+    '.json': _inspect_json,
+})
+
+SUPPORTED_UPLOAD_EXTENSIONS = tuple(_CONTENT_INSPECTORS)
+
+@lru_cache(maxsize=256)
+def _inspect_file_content(file_path: str, file_extension: str, mtime_ns: int, size: int) -> tuple:
+    """
+    Read a file's content for validation, memoized per file version
+    
+    mtime_ns and size only key the cache, so an edited file is read again.
+    
+    Returns:
+        Tuple of (errors, file_info entries), with columns as a tuple
+    """
+    inspector = _CONTENT_INSPECTORS.get(file_extension)
+    if inspector is None:
+        return (), {}
+    return inspector(file_path)
+
 def validate_file_upload(file_path: str, max_size_mb: int = 100) -> Dict[str, Any]:
     """
     Validate uploaded file
@@ -36,20 +204,23 @@ def validate_file_upload(file_path: str, max_size_mb: int = 100) -> Dict[str, An
     }
     
     try:
-        # Check if file exists
-        if not os.path.exists(file_path):
+        # Check if file exists, getting its size and version from the same stat call
+        try:
+            stat = os.stat(file_path)
+        except OSError:
             result['errors'].append("File does not exist")
             return result
         
         # Get file info
-        file_size = os.path.getsize(file_path)
-        file_extension = os.path.splitext(file_path)[1].lower()
+        file_size = stat.st_size
+        file_name = os.path.basename(file_path)
+        file_extension = os.path.splitext(file_name)[1].lower()
         
         result['file_info'] = {
             'size_bytes': file_size,
             'size_mb': round(file_size / (1024 * 1024), 2),
             'extension': file_extension,
-            'name': os.path.basename(file_path)
+            'name': file_name
         }
         
         # Check file size
@@ -57,40 +228,15 @@ def validate_file_upload(file_path: str, max_size_mb: int = 100) -> Dict[str, An
             result['errors'].append(f"File size ({result['file_info']['size_mb']} MB) exceeds maximum allowed size ({max_size_mb} MB)")
         
         # Check file extension
-        supported_extensions = ['.csv', '.xlsx', '.xls', '.json']
-        if file_extension not in supported_extensions:
-            result['errors'].append(f"Unsupported file type. Supported types: {', '.join(supported_extensions)}")
-        
-        # Try to read file content for validation
-        if file_extension == '.csv':
-            try:
-                df = pd.read_csv(file_path, nrows=5)  # Read first 5 rows for validation
-                if len(df.columns) == 0:
-                    result['errors'].append("CSV file appears to be empty or invalid")
-                else:
-                    result['file_info']['columns'] = df.columns.tolist()
-                    result['file_info']['sample_rows'] = len(df)
-            except Exception as e:
-                result['errors'].append(f"Unable to read CSV file: {str(e)}")
+        if file_extension not in SUPPORTED_UPLOAD_EXTENSIONS:
+            result['errors'].append(f"Unsupported file type. Supported types: {', '.join(SUPPORTED_UPLOAD_EXTENSIONS)}")
         
-        elif file_extension in ['.xlsx', '.xls']:
-            try:
-                df = pd.read_excel(file_path, nrows=5)
-                if len(df.columns) == 0:
-                    result['errors'].append("Excel file appears to be empty or invalid")
-                else:
-                    result['file_info']['columns'] = df.columns.tolist()
-                    result['file_info']['sample_rows'] = len(df)
-            except Exception as e:
-                result['errors'].append(f"Unable to read Excel file: {str(e)}")
-        
-        elif file_extension == '.json':
-            try:
-                with open(file_path, 'r') as f:
-                    data = json.load(f)
-                result['file_info']['json_type'] = type(data).__name__
-            except Exception as e:
-                result['errors'].append(f"Unable to read JSON file: {str(e)}")
+        # Try to read file content for validation (repeat checks of an unchanged file are cached)
+        errors, content_info = _inspect_file_content(file_path, file_extension, stat.st_mtime_ns, file_size)
+        result['errors'].extend(errors)
+        result['file_info'].update(content_info)
+        if 'columns' in content_info:
+            result['file_info']['columns'] = list(content_info['columns'])
         
         # Set validation result
         result['valid'] = len(result['errors']) == 0
@@ -118,14 +264,26 @@ def format_currency(amount: float, currency: str = "USD") -> str:
     Returns:
         Formatted currency string
     """
-    if currency == "USD":
-        return f"${amount:,.2f}"
-    elif currency == "EUR":
-        return f"€{amount:,.2f}"
-    elif currency == "GBP":
-        return f"£{amount:,.2f}"
-    else:
-        return f"{amount:,.2f} {currency}"
+    formatter = _CURRENCY_FORMATTERS.get(currency)
+    if formatter is not None:
+        return formatter(amount)
+    return f"{amount:,.2f} {currency}"
+
+def format_currency_series(amounts: "pd.Series", currency: str = "USD") -> "pd.Series":
+    """
+    Format a column of currency amounts for display
+    
+    Args:
+        amounts: Amounts to format
+        currency: Currency code
+        
+    Returns:
+        Series of formatted currency strings, as format_currency gives per amount
+    """
+    formatter = _CURRENCY_FORMATTERS.get(currency)
+    if formatter is None:
+        formatter = lambda amount: f"{amount:,.2f} {currency}"
+    return amounts.map(formatter)
 
 def format_percentage(value: float, decimal_places: int = 1) -> str:
     """
@@ -140,6 +298,23 @@ def format_percentage(value: float, decimal_places: int = 1) -> str:
     """
     return f"{value:.{decimal_places}f}%"
 
+def format_percentage_series(values: "pd.Series", decimal_places: int = 1) -> "pd.Series":
+    """
+    Format a column of percentages for display
+    
+    Args:
+        values: Percentage values
+        decimal_places: Number of decimal places
+        
+    Returns:
+        Series of formatted percentage strings, as format_percentage gives per value
+    """
+    import numpy as np
+    import pandas as pd
+    
+    formatted = np.char.mod(f"%.{decimal_places}f%%", values.to_numpy(dtype=np.float64))
+    return pd.Series(formatted, index=values.index, name=values.name, dtype=object)
+
 def format_number(value: Union[int, float], abbreviate: bool = True) -> str:
     """
     Format large numbers with abbreviations
@@ -163,6 +338,40 @@ def format_number(value: Union[int, float], abbreviate: bool = True) -> str:
     else:
         return str(value)
 
+# (threshold, suffix) from largest to smallest, matching format_number
+_NUMBER_ABBREVIATIONS = ((1_000_000_000, 'B'), (1_000_000, 'M'), (1_000, 'K'))
+
+def format_number_array(values: Union["np.ndarray", "pd.Series", List[float]]) -> "np.ndarray":
+    """
+    Format many numbers with abbreviations at once
+    
+    Produces the same strings as format_number(value) for each element,
+    but picks the K/M/B bucket with array masks instead of per-value branches.
+    Values below 1,000 are formatted from the original elements, so ints in
+    mixed int/float input stay ints.
+    
+    Args:
+        values: Numbers to format
+        
+    Returns:
+        Object array of formatted number strings
+    """
+    import numpy as np
+    
+    # The numeric array upcasts mixed input to float, so unabbreviated values use the original elements
+    originals = np.asarray(values, dtype=object)
+    values = np.asarray(values)
+    out = np.empty(values.shape, dtype=object)
+    remaining = np.ones(values.shape, dtype=bool)
+    
+    for threshold, suffix in _NUMBER_ABBREVIATIONS:
+        mask = remaining & (values >= threshold)
+        out[mask] = np.char.mod(f'%.1f{suffix}', values[mask] / threshold)
+        remaining &= ~mask
+    
+    out[remaining] = [str(value) for value in originals[remaining]]
+    return out
+
 def image_to_base64(image_path: str) -> str:
     """
     Convert image to base64 string for display in Streamlit
@@ -175,7 +384,15 @@ def image_to_base64(image_path: str) -> str:
     """
     try:
         with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode()
+            size = os.fstat(img_file.fileno()).st_size
+            if size > _MMAP_THRESHOLD_BYTES:
+                with mmap.mmap(img_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return base64.b64encode(mapped).decode('ascii')
+            
+            # Read into one preallocated buffer; base64 output is pure ASCII
+            buffer = bytearray(size)
+            img_file.readinto(buffer)
+            return base64.b64encode(buffer).decode('ascii')
     except Exception as e:
         logger.error(f"Error converting image to base64: {str(e)}")
         return ""
@@ -193,13 +410,16 @@ def resize_image(image_path: str, max_width: int = 800, max_height: int = 600) -
         Path to resized image
     """
     try:
+        from PIL import Image
+        
         with Image.open(image_path) as img:
-            # Calculate new dimensions
+            # Calculate new dimensions (thumbnail already drafts JPEGs at a reduced
+            # DCT scale and box-reduces before the Lanczos pass, via reducing_gap)
             img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
             
-            # Save resized image
+            # Save resized image; fast zlib level, since this is a display copy
             output_path = f"{os.path.splitext(image_path)[0]}_resized.png"
-            img.save(output_path, "PNG")
+            img.save(output_path, "PNG", compress_level=1)
             
             return output_path
             
@@ -207,91 +427,70 @@ def resize_image(image_path: str, max_width: int = 800, max_height: int = 600) -
         logger.error(f"Error resizing image: {str(e)}")
         return image_path  # Return original path if resize fails
 
-def create_sample_data() -> pd.DataFrame:
+def create_sample_data() -> "pd.DataFrame":
     """
     Create sample customer data for demonstration
     
+    The data is seeded, so it is generated once and each call gets a copy.
+    
     Returns:
         Sample customer DataFrame
     """
-    np.random.seed(42)
+    return _build_sample_data().copy()
+
+@lru_cache(maxsize=1)
+def _build_sample_data() -> "pd.DataFrame":
+    """Generate the seeded sample customers shared by create_sample_data()"""
+    import numpy as np
+    import pandas as pd
+    
+    rng = np.random.default_rng(42)
+    n = 500
+    
+    def categorical(categories: List[str], p: Optional[List[float]] = None) -> "pd.Categorical":
+        # Draw integer codes into the category list instead of building n strings
+        return pd.Categorical.from_codes(rng.choice(len(categories), n, p=p), categories)
     
+    customer_ids = np.arange(1, n + 1)
     sample_data = {
-        'customer_id': range(1, 501),
-        'name': [f"Customer_{i}" for i in range(1, 501)],
-        'age': np.random.randint(18, 70, 500),
-        'gender': np.random.choice(['Male', 'Female', 'Other'], 500, p=[0.45, 0.45, 0.1]),
-        'location': np.random.choice(['New York', 'California', 'Texas', 'Florida', 'Illinois', 'Pennsylvania', 'Ohio'], 500),
-        'interests': np.random.choice(['Technology', 'Fashion', 'Sports', 'Travel', 'Food', 'Art', 'Music'], 500),
-        'annual_income': np.random.randint(25000, 150000, 500),
-        'purchase_history': np.random.choice(['Electronics', 'Clothing', 'Books', 'Home', 'Beauty', 'Sports'], 500),
-        'customer_since': pd.date_range('2020-01-01', '2023-12-31', periods=500),
-        'total_spent': np.random.randint(100, 5000, 500)
+        'customer_id': customer_ids,
+        'name': np.char.add('Customer_', customer_ids.astype(str)),
+        'age': rng.integers(18, 70, n),
+        'gender': categorical(['Male', 'Female', 'Other'], p=[0.45, 0.45, 0.1]),
+        'location': categorical(['New York', 'California', 'Texas', 'Florida', 'Illinois', 'Pennsylvania', 'Ohio']),
+        'interests': categorical(['Technology', 'Fashion', 'Sports', 'Travel', 'Food', 'Art', 'Music']),
+        'annual_income': rng.integers(25000, 150000, n),
+        'purchase_history': categorical(['Electronics', 'Clothing', 'Books', 'Home', 'Beauty', 'Sports']),
+        'customer_since': pd.date_range('2020-01-01', '2023-12-31', periods=n),
+        'total_spent': rng.integers(100, 5000, n)
     }
     
-    return pd.DataFrame(sample_data)
+    return pd.DataFrame(sample_data, copy=False)
 
-def generate_campaign_templates() -> Dict[str, Any]:
+def generate_campaign_templates() -> Mapping[str, Mapping[str, Any]]:
     """
-    Generate pre-defined campaign templates
+    Get the pre-defined campaign templates
     
     Returns:
-        Dictionary of campaign templates
-    """
-    templates = {
-        "fashion_brand": {
-            "name": "Fashion Brand Campaign",
-            "product": "Fashion collection",
-            "style": "modern",
-            "mood": "stylish",
-            "target_audience": "fashion-conscious consumers",
-            "additional_elements": ["trendy models", "urban background", "vibrant colors"],
-            "industry": "Fashion",
-            "budget_range": "medium"
-        },
-        "tech_product": {
-            "name": "Tech Product Launch",
-            "product": "Tech gadget",
-            "style": "futuristic",
-            "mood": "innovative",
-            "target_audience": "tech enthusiasts",
-            "additional_elements": ["sleek design", "minimalist", "high-tech environment"],
-            "industry": "Technology",
-            "budget_range": "high"
-        },
-        "food_restaurant": {
-            "name": "Restaurant Promotion",
-            "product": "Gourmet food",
-            "style": "appetizing",
-            "mood": "warm and inviting",
-            "target_audience": "food lovers",
-            "additional_elements": ["delicious presentation", "cozy atmosphere", "natural lighting"],
-            "industry": "Food & Beverage",
-            "budget_range": "low"
-        },
-        "fitness_health": {
-            "name": "Fitness Brand",
-            "product": "Fitness program",
-            "style": "energetic",
-            "mood": "motivational",
-            "target_audience": "fitness enthusiasts",
-            "additional_elements": ["active people", "gym environment", "dynamic poses"],
-            "industry": "Health & Fitness",
-            "budget_range": "medium"
-        },
-        "luxury_goods": {
-            "name": "Luxury Brand",
-            "product": "Luxury items",
-            "style": "elegant",
-            "mood": "sophisticated",
-            "target_audience": "affluent consumers",
-            "additional_elements": ["premium materials", "elegant lighting", "refined setting"],
-            "industry": "Luxury",
-            "budget_range": "high"
-        }
-    }
+        Read-only mapping of campaign templates (shared, built once at import)
+    """
+    return _CAMPAIGN_TEMPLATES
+
+# Metric names of calculate_campaign_roi results, also the column order of calculate_campaign_roi_bulk
+ROI_METRIC_COLUMNS = ('roi_percentage', 'roas', 'profit', 'profit_margin')
+
+@lru_cache(maxsize=1024)
+def _campaign_roi_metrics(total_revenue: float, total_spend: float) -> Tuple[float, float, float, float]:
+    """ROI metrics for a (revenue, spend) pair in ROI_METRIC_COLUMNS order, memoized per pair"""
+    if total_spend == 0:
+        return 0, 0, total_revenue, 100 if total_revenue > 0 else 0
     
-    return templates
+    roi_percentage = ((total_revenue - total_spend) / total_spend) * 100
+    roas = (total_revenue / total_spend) * 100
+    profit = total_revenue - total_spend
+    profit_margin = (profit / total_revenue) * 100 if total_revenue > 0 else 0
+    
+    return round(roi_percentage, 2), round(roas, 2), round(profit, 2), round(profit_margin, 2)
 
 def calculate_campaign_roi(total_revenue: float, total_spend: float) -> Dict[str, float]:
     """
@@ -304,25 +503,40 @@ def calculate_campaign_roi(total_revenue: float, total_spend: float) -> Dict[str
     Returns:
         Dictionary containing ROI metrics
     """
-    if total_spend == 0:
-        return {
-            'roi_percentage': 0,
-            'roas': 0,
-            'profit': total_revenue,
-            'profit_margin': 100 if total_revenue > 0 else 0
-        }
+    return dict(zip(ROI_METRIC_COLUMNS, _campaign_roi_metrics(total_revenue, total_spend)))
+
+def calculate_campaign_roi_bulk(total_revenue: "np.ndarray", total_spend: "np.ndarray") -> "np.ndarray":
+    """
+    Calculate campaign ROI metrics for many campaigns at once
     
-    roi_percentage = ((total_revenue - total_spend) / total_spend) * 100
-    roas = (total_revenue / total_spend) * 100
-    profit = total_revenue - total_spend
-    profit_margin = (profit / total_revenue) * 100 if total_revenue > 0 else 0
+    Args:
+        total_revenue: Total revenue generated per campaign
+        total_spend: Total amount spent per campaign
+        
+    Returns:
+        Array of shape (n, 4) with the calculate_campaign_roi metrics per
+        campaign, in ROI_METRIC_COLUMNS order
+    """
+    import numpy as np
     
-    return {
-        'roi_percentage': round(roi_percentage, 2),
-        'roas': round(roas, 2),
-        'profit': round(profit, 2),
-        'profit_margin': round(profit_margin, 2)
-    }
+    revenue = np.asarray(total_revenue, dtype=np.float64)
+    spend = np.asarray(total_spend, dtype=np.float64)
+    profit = revenue - spend
+    has_spend = spend != 0
+    has_revenue = revenue > 0
+    
+    out = np.zeros((len(revenue), len(ROI_METRIC_COLUMNS)))
+    np.divide(profit * 100, spend, out=out[:, 0], where=has_spend)
+    np.divide(revenue * 100, spend, out=out[:, 1], where=has_spend)
+    out[:, 2] = profit
+    np.divide(profit * 100, revenue, out=out[:, 3], where=has_revenue)
+    np.round(out, 2, out=out)
+    
+    # Zero spend: no ROI, the whole revenue is (unrounded) profit
+    no_spend = ~has_spend
+    out[no_spend, 2] = revenue[no_spend]
+    out[no_spend, 3] = np.where(has_revenue[no_spend], 100.0, 0.0)
+    return out
 
 def export_to_powerbi_format(data: Dict[str, Any], output_path: str) -> str:
     """
@@ -336,36 +550,44 @@ def export_to_powerbi_format(data: Dict[str, Any], output_path: str) -> str:
         Path to exported file
     """
     try:
-        # Convert nested dictionaries to flat structure for Power BI
-        flattened_data = []
+        # Flatten the nested campaign dictionaries column by column for Power BI
+        campaign_ids, names, products, statuses, created, image_counts = [], [], [], [], [], []
+        metric_values = {column: [] for column in _POWERBI_METRIC_COLUMNS}
+        has_metrics = False
         
-        if 'campaigns' in data:
-            for campaign_id, campaign_data in data['campaigns'].items():
-                row = {
-                    'campaign_id': campaign_id,
-                    'campaign_name': campaign_data.get('config', {}).get('name', ''),
-                    'product': campaign_data.get('config', {}).get('product', ''),
-                    'status': campaign_data.get('status', ''),
-                    'created_at': campaign_data.get('created_at', ''),
-                    'images_generated': len(campaign_data.get('generated_images', [])),
-                }
-                
-                # Add performance metrics if available
-                if 'performance_metrics' in campaign_data:
-                    metrics = campaign_data['performance_metrics'].get('overall_metrics', {})
-                    row.update({
-                        'engagement_rate': metrics.get('engagement_rate', 0),
-                        'click_through_rate': metrics.get('click_through_rate', 0),
-                        'conversion_rate': metrics.get('conversion_rate', 0),
-                        'cost_per_acquisition': metrics.get('cost_per_acquisition', 0),
-                        'return_on_ad_spend': metrics.get('return_on_ad_spend', 0)
-                    })
-                
-                flattened_data.append(row)
+        for campaign_id, campaign_data in data.get('campaigns', {}).items():
+            config = campaign_data.get('config', {})
+            campaign_ids.append(campaign_id)
+            names.append(config.get('name', ''))
+            products.append(config.get('product', ''))
+            statuses.append(campaign_data.get('status', ''))
+            created.append(campaign_data.get('created_at', ''))
+            image_counts.append(len(campaign_data.get('generated_images', [])))
+            
+            # Add performance metrics if available (missing for campaigns not yet analyzed)
+            if 'performance_metrics' in campaign_data:
+                metrics = campaign_data['performance_metrics'].get('overall_metrics', {})
+                has_metrics = True
+                for column, values in metric_values.items():
+                    values.append(metrics.get(column, 0))
+            else:
+                for values in metric_values.values():
+                    values.append(None)
+        
+        columns = {
+            'campaign_id': campaign_ids,
+            'campaign_name': names,
+            'product': products,
+            'status': statuses,
+            'created_at': created,
+            'images_generated': image_counts,
+        }
+        if has_metrics:
+            columns.update(metric_values)
         
         # Convert to DataFrame and save as CSV for Power BI import
-        df = pd.DataFrame(flattened_data)
-        df.to_csv(output_path, index=False)
+        import pandas as pd
+        pd.DataFrame(columns).to_csv(output_path, index=False)
         
         logger.info(f"Data exported to Power BI format: {output_path}")
         return output_path
@@ -374,7 +596,7 @@ def export_to_powerbi_format(data: Dict[str, Any], output_path: str) -> str:
         logger.error(f"Error exporting to Power BI format: {str(e)}")
         raise
 
-def get_color_palette(theme: str = "default") -> List[str]:
+def get_color_palette(theme: str = "default") -> Tuple[str, ...]:
     """
     Get color palette for visualizations
     
@@ -382,16 +604,26 @@ def get_color_palette(theme: str = "default") -> List[str]:
         theme: Color theme name
         
     Returns:
-        List of color codes
+        Tuple of color codes
     """
-    palettes = {
-        "default": ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f"],
-        "modern": ["#667eea", "#764ba2", "#f093fb", "#f5576c", "#4facfe", "#00f2fe", "#43e97b", "#38f9d7"],
-        "corporate": ["#2c3e50", "#3498db", "#e74c3c", "#f39c12", "#27ae60", "#9b59b6", "#1abc9c", "#34495e"],
-        "vibrant": ["#ff6b6b", "#4ecdc4", "#45b7d1", "#96ceb4", "#feca57", "#ff9ff3", "#54a0ff", "#5f27cd"]
-    }
+    return _COLOR_PALETTES.get(theme, _COLOR_PALETTES["default"])
+
+@lru_cache(maxsize=None)
+def get_rgb_palette(theme: str = "default") -> "np.ndarray":
+    """
+    Get a color palette as RGB triples, parsed once per theme
     
-    return palettes.get(theme, palettes["default"])
+    Args:
+        theme: Color theme name
+        
+    Returns:
+        Read-only (n, 3) uint8 array of RGB values, in get_color_palette order
+    """
+    import numpy as np
+    
+    palette = np.array([tuple(bytes.fromhex(color[1:])) for color in get_color_palette(theme)], dtype=np.uint8)
+    palette.flags.writeable = False
+    return palette
 
 def log_user_action(action: str, details: Dict[str, Any] = None) -> None:
     """
@@ -401,13 +633,11 @@ def log_user_action(action: str, details: Dict[str, Any] = None) -> None:
         action: Action name
         details: Additional details about the action
     """
-    log_entry = {
-        'timestamp': datetime.now().isoformat(),
-        'action': action,
-        'details': details or {}
-    }
+    # Log records carry their own timestamp; skip all formatting when INFO is disabled
+    if not logger.isEnabledFor(logging.INFO):
+        return
     
-    logger.info(f"User Action: {action} - {details}")
+    logger.info("User Action: %s - %s", action, details)
     
     # In a production environment, you might want to save this to a database
-    # or send to an analytics service
+    # or send to an analytics service (building the entry there, not here)
@@ -5,16 +5,17 @@ Main Streamlit Application
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import numpy as np
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import json
 import os
 import sys
+from collections import Counter
 from datetime import datetime
-from PIL import Image
+from typing import Optional
 import io
 import base64
+import tempfile
 
 # Add src directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -91,8 +92,7 @@ if 'generated_images' not in st.session_state:
 def initialize_campaign_manager():
     """Initialize campaign manager with API key validation"""
     try:
-        config = Config()
-        if not config.OPENAI_API_KEY:
+        if not Config.OPENAI_API_KEY:
             st.error("⚠️ OpenAI API key not found. Please set your API key in the .env file.")
             st.info("Create a .env file in the project root and add: OPENAI_API_KEY=your_api_key_here")
             return False
@@ -103,6 +103,129 @@ def initialize_campaign_manager():
         st.error(f"Error initializing campaign manager: {str(e)}")
         return False
 
+# Rows per chunk when summarising CSV uploads
+_PREVIEW_ROWS = 10
+_SUMMARY_CHUNK_ROWS = 200_000
+
+def _merge_dtypes(left, right):
+    """Dtype a full parse would give a column whose chunks parsed as left and right"""
+    if left == right:
+        return left
+    if getattr(left, 'kind', 'O') in 'biuf' and getattr(right, 'kind', 'O') in 'biuf':
+        return np.promote_types(left, right)
+    return np.dtype(object)
+
+def summarize_upload(file_bytes: bytes, file_name: str) -> dict:
+    """Preview, column stats and insight inputs for an upload, reading CSVs in bounded chunks
+    (Excel files are parsed whole, and that frame is returned as 'frame')"""
+    buffer = io.BytesIO(file_bytes)
+    frame = None
+    if file_name.endswith('.csv'):
+        chunks = pd.read_csv(buffer, chunksize=_SUMMARY_CHUNK_ROWS)
+    else:
+        # read_excel has no chunked mode
+        frame = pd.read_excel(buffer)
+        chunks = [frame]
+    
+    preview = None
+    dtypes = None
+    null_counts = None
+    n_rows = 0
+    memory_bytes = 0
+    ages = []
+    gender_counts = None
+    
+    for chunk in chunks:
+        if preview is None:
+            preview = chunk.head(_PREVIEW_ROWS)
+            dtypes = dict(chunk.dtypes)
+            null_counts = chunk.isna().sum()
+        else:
+            dtypes = {col: _merge_dtypes(dtype, chunk[col].dtype) for col, dtype in dtypes.items()}
+            null_counts += chunk.isna().sum()
+        n_rows += len(chunk)
+        # Shallow: buffer sizes only, without sizing every Python object in object columns
+        memory_bytes += int(chunk.memory_usage(index=False).sum())
+        
+        # Only the columns the insight charts plot are kept across chunks
+        if 'age' in chunk.columns:
+            ages.append(chunk['age'])
+        if 'gender' in chunk.columns:
+            counts = chunk['gender'].value_counts()
+            gender_counts = counts if gender_counts is None else gender_counts.add(counts, fill_value=0)
+    
+    if preview is None:
+        preview = pd.DataFrame()
+        dtypes = {}
+        null_counts = pd.Series(dtype='int64')
+    
+    return {
+        'preview': preview,
+        'columns': list(dtypes),
+        'dtypes': pd.Series(dtypes, dtype=object),
+        'null_counts': null_counts,
+        'n_rows': n_rows,
+        'memory_bytes': memory_bytes,
+        'ages': pd.concat(ages, ignore_index=True) if ages else None,
+        'gender_counts': gender_counts.astype('int64').sort_values(ascending=False) if gender_counts is not None else None,
+        'frame': frame
+    }
+
+def read_uploaded_frame(file_bytes: bytes, file_name: str, text_dtypes: Optional[dict] = None) -> pd.DataFrame:
+    """Parse the full uploaded file (text_dtypes: string columns found by summarize_upload)"""
+    buffer = io.BytesIO(file_bytes)
+    if not file_name.endswith('.csv'):
+        return pd.read_excel(buffer)
+    
+    if Config.CSV_ENGINE != 'c':
+        try:
+            # Pinning the text columns stops pyarrow inferring timestamps the C parser leaves as strings
+            return pd.read_csv(buffer, engine=Config.CSV_ENGINE, dtype=text_dtypes)
+        except ValueError:
+            # Rows the pyarrow reader rejects (e.g. ragged lines) fall back to the C parser
+            buffer.seek(0)
+    return pd.read_csv(buffer)
+
+def get_customer_data():
+    """Session customer data, parsing a pending upload the first time it is needed"""
+    pending = st.session_state.get('pending_upload')
+    if pending is not None:
+        st.session_state.customer_data = read_uploaded_frame(*pending)
+        st.session_state.pending_upload = None
+    return st.session_state.get('customer_data')
+
+def has_customer_data() -> bool:
+    """Whether customer data is loaded or an upload is waiting to be parsed"""
+    return 'customer_data' in st.session_state or st.session_state.get('pending_upload') is not None
+
+_AGE_HISTOGRAM_BINS = 30
+
+@st.cache_data(show_spinner=False)
+def age_histogram_figure(ages: np.ndarray) -> go.Figure:
+    """Age histogram binned once with NumPy, so the chart carries bin counts instead of every row"""
+    ages = ages[~np.isnan(ages)]
+    counts, edges = np.histogram(ages, bins=_AGE_HISTOGRAM_BINS)
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+                           marker_color=get_color_palette('modern')[0]))
+    fig.update_layout(title='Age Distribution', xaxis_title='age', yaxis_title='count', bargap=0)
+    return fig
+
+@st.cache_data(show_spinner=False)
+def load_uploaded_data(file_bytes: bytes, file_name: str):
+    """Validate and summarise an uploaded file once per distinct upload (reruns hit the cache)"""
+    # validate_file_upload works on paths, so the bytes go to disk once per new upload
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = os.path.join(temp_dir, os.path.basename(file_name))
+        with open(temp_path, "wb") as f:
+            f.write(file_bytes)
+        validation_result = validate_file_upload(temp_path)
+    
+    if not validation_result['valid']:
+        return validation_result, None
+    
+    # Summarise straight from the in-memory upload; the full frame is parsed on demand
+    return validation_result, summarize_upload(file_bytes, file_name)
+
 def main_dashboard():
     """Main dashboard page"""
     st.markdown("""
@@ -117,6 +240,9 @@ def main_dashboard():
     if st.session_state.campaign_manager:
         campaigns = st.session_state.campaign_manager.list_campaigns()
         if campaigns:
+            # Tally statuses once rather than rescanning the list for each status stat
+            status_counts = Counter(c['status'] for c in campaigns)
+            
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
@@ -127,11 +253,11 @@ def main_dashboard():
                 st.metric("Images Generated", total_images)
             
             with col3:
-                active_campaigns = sum(1 for c in campaigns if c['status'] in ['created', 'analyzed', 'generated'])
+                active_campaigns = sum(status_counts[status] for status in ('created', 'analyzed', 'generated'))
                 st.metric("Active Campaigns", active_campaigns)
             
             with col4:
-                completed_campaigns = sum(1 for c in campaigns if c['status'] == 'analyzed')
+                completed_campaigns = status_counts['analyzed']
                 st.metric("Completed", completed_campaigns)
     
     # Feature highlights
@@ -182,6 +308,9 @@ def main_dashboard():
 
 def data_upload_page():
     """Data upload and validation page"""
+    # plotly.express is only needed by the chart pages, so it loads on first visit
+    import plotly.express as px
+    
     st.header("📁 Data Upload & Management")
     
     # File upload
@@ -193,57 +322,55 @@ def data_upload_page():
     
     if uploaded_file is not None:
         try:
-            # Save uploaded file temporarily
-            temp_path = f"temp_{uploaded_file.name}"
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            # Validate file
-            validation_result = validate_file_upload(temp_path)
+            # Validate and summarise the file (cached per upload)
+            file_bytes = uploaded_file.getvalue()
+            validation_result, summary = load_uploaded_data(file_bytes, uploaded_file.name)
             
             if validation_result['valid']:
                 st.success("✅ File uploaded and validated successfully!")
                 
-                # Load and display data
-                if uploaded_file.name.endswith('.csv'):
-                    df = pd.read_csv(temp_path)
-                else:
-                    df = pd.read_excel(temp_path)
-                
                 st.subheader("📋 Data Preview")
-                st.dataframe(df.head(10))
+                st.dataframe(summary['preview'])
                 
                 # Data summary
                 col1, col2 = st.columns(2)
                 
                 with col1:
                     st.subheader("📊 Data Summary")
-                    st.metric("Total Rows", len(df))
-                    st.metric("Total Columns", len(df.columns))
-                    st.metric("Memory Usage", f"{df.memory_usage(deep=True).sum() / 1024:.1f} KB")
+                    st.metric("Total Rows", summary['n_rows'])
+                    st.metric("Total Columns", len(summary['columns']))
+                    st.metric("Memory Usage", f"{summary['memory_bytes'] / 1024:.1f} KB (approx)")
                 
                 with col2:
                     st.subheader("🔍 Column Information")
+                    # Both columns derive from the one null count per column
+                    null_counts = summary['null_counts'].to_numpy()
+                    n_rows = summary['n_rows']
                     column_info = pd.DataFrame({
-                        'Column': df.columns,
-                        'Type': df.dtypes,
-                        'Non-Null': df.count(),
-                        'Null %': ((len(df) - df.count()) / len(df) * 100).round(1)
-                    })
+                        'Column': summary['columns'],
+                        'Type': summary['dtypes'].to_numpy(),
+                        'Non-Null': n_rows - null_counts,
+                        'Null %': (null_counts * 100.0 / n_rows).round(1) if n_rows else np.nan
+                    }, index=summary['columns'])
                     st.dataframe(column_info)
                 
-                # Store data in session state
-                st.session_state.customer_data = df
-                st.session_state.data_file_path = temp_path
+                # Defer the full parse until a page needs the data
+                if st.session_state.get('upload_id') != uploaded_file.file_id:
+                    st.session_state.upload_id = uploaded_file.file_id
+                    st.session_state.upload_summary = summary
+                    if summary['frame'] is not None:
+                        # The summary already parsed the whole workbook
+                        st.session_state.customer_data = summary['frame']
+                        st.session_state.pending_upload = None
+                    else:
+                        text_dtypes = {col: dtype for col, dtype in summary['dtypes'].items() if dtype.kind == 'O'}
+                        st.session_state.pending_upload = (file_bytes, uploaded_file.name, text_dtypes)
+                        st.session_state.pop('customer_data', None)
                 
             else:
                 st.error("❌ File validation failed:")
                 for error in validation_result['errors']:
                     st.error(f"• {error}")
-            
-            # Cleanup temp file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
                 
         except Exception as e:
             st.error(f"Error processing file: {str(e)}")
@@ -256,28 +383,38 @@ def data_upload_page():
     if st.button("Load Sample Data"):
         sample_df = create_sample_data()
         st.session_state.customer_data = sample_df
+        st.session_state.pending_upload = None
         st.success("✅ Sample data loaded successfully!")
         st.dataframe(sample_df.head(10))
     
     # Data insights
-    if 'customer_data' in st.session_state:
+    if has_customer_data():
         st.markdown("---")
         st.subheader("🔍 Data Insights")
         
-        df = st.session_state.customer_data
+        # Pending uploads chart from their chunked summary instead of the full frame
+        if 'customer_data' in st.session_state:
+            df = st.session_state.customer_data
+            ages = df['age'] if 'age' in df.columns else None
+            gender_counts = df['gender'].value_counts() if 'gender' in df.columns else None
+        else:
+            ages = st.session_state.upload_summary['ages']
+            gender_counts = st.session_state.upload_summary['gender_counts']
         
         # Create visualizations
         col1, col2 = st.columns(2)
         
         with col1:
-            if 'age' in df.columns:
-                fig_age = px.histogram(df, x='age', title='Age Distribution', 
-                                     color_discrete_sequence=get_color_palette('modern'))
+            if ages is not None:
+                if pd.api.types.is_numeric_dtype(ages):
+                    fig_age = age_histogram_figure(ages.to_numpy(dtype=float))
+                else:
+                    fig_age = px.histogram(x=ages, title='Age Distribution', labels={'x': 'age'},
+                                         color_discrete_sequence=get_color_palette('modern'))
                 st.plotly_chart(fig_age, use_container_width=True)
         
         with col2:
-            if 'gender' in df.columns:
-                gender_counts = df['gender'].value_counts()
+            if gender_counts is not None:
                 fig_gender = px.pie(values=gender_counts.values, names=gender_counts.index,
                                   title='Gender Distribution', 
                                   color_discrete_sequence=get_color_palette('vibrant'))
@@ -288,7 +425,7 @@ def campaign_creation_page():
     st.header("🎯 Campaign Creation")
     
     # Check if data is loaded
-    if 'customer_data' not in st.session_state:
+    if not has_customer_data():
         st.warning("⚠️ Please upload customer data first before creating a campaign.")
         st.info("Go to 'Data Upload' page to upload your customer data or use sample data.")
         return
@@ -384,7 +521,7 @@ def campaign_creation_page():
                 # Create campaign
                 campaign_id = st.session_state.campaign_manager.create_campaign(
                     campaign_config=campaign_config,
-                    customer_data=st.session_state.customer_data
+                    customer_data=get_customer_data()
                 )
                 
                 st.session_state.current_campaign_id = campaign_id
@@ -406,6 +543,8 @@ def campaign_creation_page():
 
 def audience_analysis_page():
     """Audience analysis and segmentation page"""
+    import plotly.express as px
+    
     st.header("🔍 Audience Analysis & Segmentation")
     
     if not st.session_state.campaign_manager:
@@ -440,23 +579,28 @@ def audience_analysis_page():
     # Segmentation controls
     st.subheader("🎯 Customer Segmentation")
     
-    if 'customer_data' in st.session_state:
-        df = st.session_state.customer_data
+    if has_customer_data():
+        df = get_customer_data()
         available_features = df.columns.tolist()
         
         # Feature selection for segmentation
-        default_features = [col for col in ['age', 'gender', 'location', 'interests', 'annual_income'] 
-                          if col in available_features]
+        # Membership against the Index is a hash lookup, not a scan of the list
+        default_features = [col for col in ('age', 'gender', 'location', 'interests', 'annual_income')
+                          if col in df.columns]
         
-        selected_features = st.multiselect(
-            "Select features for segmentation",
-            available_features,
-            default=default_features
-        )
-        
-        n_segments = st.slider("Number of segments", 2, 8, 4)
+        # Controls only rerun the script when the form is submitted
+        with st.form("audience_analysis"):
+            selected_features = st.multiselect(
+                "Select features for segmentation",
+                available_features,
+                default=default_features
+            )
+            
+            n_segments = st.slider("Number of segments", 2, 8, 4)
+            
+            submitted = st.form_submit_button("🔍 Analyze Audience", type="primary")
         
-        if st.button("🔍 Analyze Audience", type="primary"):
+        if submitted:
             if not selected_features:
                 st.error("Please select at least one feature for segmentation.")
                 return
@@ -501,17 +645,7 @@ def audience_analysis_page():
                 # Detailed segment characteristics
                 st.subheader("🔍 Segment Characteristics")
                 
-                for segment_name, segment_info in segments.items():
-                    with st.expander(f"📈 {segment_name} Details"):
-                        st.write(f"**Size:** {segment_info['size']} customers ({segment_info['percentage']:.1f}%)")
-                        
-                        characteristics = segment_info['characteristics']
-                        for feature, stats in characteristics.items():
-                            if isinstance(stats, dict):
-                                if 'mean' in stats:
-                                    st.write(f"**{feature}:** Average {stats['mean']:.1f}")
-                                elif 'mode' in stats:
-                                    st.write(f"**{feature}:** Most common '{stats['mode']}'")
+                st.dataframe(analysis_result['segment_table'])
                 
                 # Data insights
                 if 'insights' in analysis_result:
@@ -527,9 +661,7 @@ def audience_analysis_page():
                     
                     with col2:
                         if 'gender_distribution' in insights:
-                            gender_dist = insights['gender_distribution']
-                            most_common_gender = max(gender_dist.keys(), key=lambda x: gender_dist[x])
-                            st.metric("Primary Gender", most_common_gender)
+                            st.metric("Primary Gender", insights.get('primary_gender', 'N/A'))
                 
                 log_user_action("audience_analyzed", {
                     'campaign_id': campaign_id,
@@ -579,27 +711,34 @@ def image_generation_page():
     # Generation settings
     st.subheader("⚙️ Generation Settings")
     
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        images_per_segment = st.slider("Images per Segment", 1, 5, 2)
-    
-    with col2:
-        image_size = st.selectbox("Image Size", ["1024x1024", "1792x1024", "1024x1792"])
-    
-    with col3:
-        quality = st.selectbox("Quality", ["standard", "hd"])
+    # Controls only rerun the script when the form is submitted
+    with st.form("image_generation"):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            images_per_segment = st.slider("Images per Segment", 1, 5, 2)
+        
+        with col2:
+            image_size = st.selectbox("Image Size", ["1024x1024", "1792x1024", "1024x1792"])
+        
+        with col3:
+            quality = st.selectbox("Quality", ["standard", "hd"])
+        
+        submitted = st.form_submit_button("🎨 Generate Images", type="primary")
     
     # Generate images
-    if st.button("🎨 Generate Images", type="primary"):
+    if submitted:
         try:
-            with st.spinner("Generating personalized marketing images..."):
-                generation_result = st.session_state.campaign_manager.generate_campaign_images(
-                    campaign_id=campaign_id,
-                    images_per_segment=images_per_segment,
-                    image_size=image_size,
-                    quality=quality
-                )
+            progress_bar = st.progress(0.0, text="Generating personalized marketing images...")
+            generation_result = st.session_state.campaign_manager.generate_campaign_images(
+                campaign_id=campaign_id,
+                images_per_segment=images_per_segment,
+                image_size=image_size,
+                quality=quality,
+                progress_callback=lambda done, total: progress_bar.progress(
+                    done / total, text=f"Generated {done} of {total} images")
+            )
+            progress_bar.empty()
             
             st.success(f"✅ Generated {generation_result['successful_generations']} images successfully!")
             
@@ -634,9 +773,8 @@ def image_generation_page():
             if result['success'] and 'image_data' in result:
                 with cols[i % 3]:
                     try:
-                        # Display image
-                        image = Image.open(io.BytesIO(result['image_data']))
-                        st.image(image, caption=f"Image {i+1}", use_column_width=True)
+                        # Display image (st.image decodes the PNG bytes itself)
+                        st.image(result['image_data'], caption=f"Image {i+1}", use_column_width=True)
                         
                         # Show prompt
                         with st.expander(f"Prompt for Image {i+1}"):
@@ -653,6 +791,28 @@ def image_generation_page():
                     except Exception as e:
                         st.error(f"Error displaying image {i+1}: {str(e)}")
 
+# Overall performance cards as (label, metric key, decimal places), and the
+# benchmark each metric's delta is shown against once it is exceeded
+_METRIC_CARDS = (
+    ("Engagement Rate", 'engagement_rate', 1),
+    ("Click-Through Rate", 'click_through_rate', 1),
+    ("Conversion Rate", 'conversion_rate', 1),
+    ("ROAS", 'return_on_ad_spend', 0),
+)
+_METRIC_BENCHMARKS = np.array([2.5, 1.0, 2.0, 300.0])
+
+@st.cache_data(show_spinner=False)
+def segment_performance_figure(segments: tuple, engagement_rates: tuple, conversion_rates: tuple) -> go.Figure:
+    """Grouped bar chart of segment rates, built from plain arrays and reused across reruns"""
+    colors = get_color_palette('vibrant')
+    fig = go.Figure([
+        go.Bar(x=segments, y=engagement_rates, name='engagement_rate', marker_color=colors[0]),
+        go.Bar(x=segments, y=conversion_rates, name='conversion_rate', marker_color=colors[1])
+    ])
+    fig.update_layout(title='Performance by Segment', barmode='group',
+                      xaxis_title='Segments', yaxis_title='Rate (%)')
+    return fig
+
 def performance_analytics_page():
     """Performance analytics and reporting page"""
     st.header("📊 Performance Analytics")
@@ -689,35 +849,17 @@ def performance_analytics_page():
             
             metrics = performance_result['overall_metrics']
             
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.metric(
-                    "Engagement Rate",
-                    format_percentage(metrics['engagement_rate']),
-                    delta=f"{metrics['engagement_rate'] - 2.5:.1f}%" if metrics['engagement_rate'] > 2.5 else None
-                )
+            # All deltas against the benchmarks in one array operation
+            values = np.array([metrics[key] for _, key, _ in _METRIC_CARDS], dtype=float)
+            deltas = values - _METRIC_BENCHMARKS
             
-            with col2:
-                st.metric(
-                    "Click-Through Rate",
-                    format_percentage(metrics['click_through_rate']),
-                    delta=f"{metrics['click_through_rate'] - 1.0:.1f}%" if metrics['click_through_rate'] > 1.0 else None
-                )
-            
-            with col3:
-                st.metric(
-                    "Conversion Rate",
-                    format_percentage(metrics['conversion_rate']),
-                    delta=f"{metrics['conversion_rate'] - 2.0:.1f}%" if metrics['conversion_rate'] > 2.0 else None
-                )
-            
-            with col4:
-                st.metric(
-                    "ROAS",
-                    format_percentage(metrics['return_on_ad_spend'], 0),
-                    delta=f"{metrics['return_on_ad_spend'] - 300:.0f}%" if metrics['return_on_ad_spend'] > 300 else None
-                )
+            for col, (label, _, decimals), value, delta in zip(st.columns(4), _METRIC_CARDS, values, deltas):
+                with col:
+                    st.metric(
+                        label,
+                        format_percentage(value, decimals),
+                        delta=f"{delta:.{decimals}f}%" if delta > 0 else None
+                    )
             
             # Performance visualization
             st.subheader("📊 Performance Visualization")
@@ -747,28 +889,25 @@ def performance_analytics_page():
                 st.subheader("🎯 Segment Performance")
                 
                 segment_perf = performance_result['segment_performance']
-                if segment_perf:
-                    segment_df = pd.DataFrame.from_dict(segment_perf, orient='index')
-                    
+                if not segment_perf:
+                    st.caption("No segment data yet")
+                else:
                     # Segment performance chart
-                    fig_segments = px.bar(
-                        segment_df.reset_index(),
-                        x='index',
-                        y=['engagement_rate', 'conversion_rate'],
-                        title='Performance by Segment',
-                        barmode='group',
-                        color_discrete_sequence=get_color_palette('vibrant')
+                    fig_segments = segment_performance_figure(
+                        tuple(segment_perf),
+                        tuple(perf['engagement_rate'] for perf in segment_perf.values()),
+                        tuple(perf['conversion_rate'] for perf in segment_perf.values())
                     )
-                    fig_segments.update_xaxis_title("Segments")
-                    fig_segments.update_yaxis_title("Rate (%)")
                     st.plotly_chart(fig_segments, use_container_width=True)
             
             # Recommendations
             if 'recommendations' in performance_result:
                 st.subheader("💡 Recommendations")
                 
-                for i, recommendation in enumerate(performance_result['recommendations'], 1):
-                    st.info(f"**{i}.** {recommendation}")
+                # One element for the whole list instead of one per recommendation
+                if performance_result['recommendations']:
+                    st.info("\n\n".join(f"**{i}.** {recommendation}"
+                                         for i, recommendation in enumerate(performance_result['recommendations'], 1)))
             
             log_user_action("performance_analyzed", {'campaign_id': campaign_id})
             
@@ -785,8 +924,9 @@ def performance_analytics_page():
             try:
                 exported_files = st.session_state.campaign_manager.export_campaign_data(campaign_id)
                 st.success(f"✅ Exported {len(exported_files)} files successfully!")
-                for file_type, file_path in exported_files.items():
-                    st.info(f"**{file_type.title()}**: {file_path}")
+                if exported_files:
+                    st.info("\n\n".join(f"**{file_type.title()}**: {file_path}"
+                                         for file_type, file_path in exported_files.items()))
             except Exception as e:
                 st.error(f"Error exporting data: {str(e)}")
     
@@ -815,8 +955,8 @@ def main():
     st.sidebar.markdown("---")
     st.sidebar.subheader("⚙️ Configuration")
     
-    config = Config()
-    if config.OPENAI_API_KEY:
+    # Settings are class attributes read once when src.config is imported
+    if Config.OPENAI_API_KEY:
         st.sidebar.success("✅ OpenAI API Key Configured")
     else:
         st.sidebar.error("❌ OpenAI API Key Missing")
@@ -824,8 +964,8 @@ def main():
     
     # Campaign status
     if st.session_state.campaign_manager:
-        campaigns = st.session_state.campaign_manager.list_campaigns()
-        st.sidebar.metric("Active Campaigns", len(campaigns))
+        # Only the count is shown, so skip building the campaign list the page may build again
+        st.sidebar.metric("Active Campaigns", len(st.session_state.campaign_manager.campaigns))
     
     st.sidebar.markdown("---")
     st.sidebar.markdown("**BrandGen v1.0.0**")
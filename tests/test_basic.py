@@ -3,8 +3,14 @@ Basic tests for BrandGen components
 """
 
 import pytest
+import asyncio
+import json
 import os
 import sys
+import threading
+from types import SimpleNamespace
+import numpy as np
+import openai
 import pandas as pd
 from unittest.mock import Mock, patch
 
@@ -13,6 +19,20 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from src.config import Config, validate_config
 from src.data_analysis import DataAnalyzer
+from src.data_processor import DataProcessor
+import src.image_generator as image_generator_module
+from src.image_generator import ImageGenerator, _RequestPacer, _run_coroutine
+from src.utils import (ROI_METRIC_COLUMNS, calculate_campaign_roi, calculate_campaign_roi_bulk,
+                       export_to_powerbi_format, format_currency, format_currency_series, format_number,
+                       format_number_array, format_percentage, format_percentage_series, get_color_palette,
+                       get_rgb_palette, validate_file_upload)
+
+@pytest.fixture(scope="module")
+def sample_analyzer():
+    """DataAnalyzer holding 100 generated sample customers, shared by the module."""
+    analyzer = DataAnalyzer()
+    analyzer.generate_sample_customer_data(100)
+    return analyzer
 
 class TestConfig:
     """Test configuration module."""
@@ -26,13 +46,11 @@ class TestConfig:
     
     def test_validate_config_without_api_key(self):
         """Test configuration validation without API key."""
-        with patch.dict(os.environ, {}, clear=True):
-            assert validate_config() == False
+        assert validate_config(env={}) == False
     
     def test_validate_config_with_api_key(self):
         """Test configuration validation with API key."""
-        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}, clear=True):
-            assert validate_config() == True
+        assert validate_config(env={'OPENAI_API_KEY': 'test-key'}) == True
 
 class TestDataAnalyzer:
     """Test data analysis module."""
@@ -43,10 +61,9 @@ class TestDataAnalyzer:
         assert analyzer.config is not None
         assert analyzer.customer_data is None
     
-    def test_generate_sample_customer_data(self):
+    def test_generate_sample_customer_data(self, sample_analyzer):
         """Test sample data generation."""
-        analyzer = DataAnalyzer()
-        data = analyzer.generate_sample_customer_data(100)
+        data = sample_analyzer.customer_data
         
         assert isinstance(data, pd.DataFrame)
         assert len(data) == 100
@@ -55,13 +72,9 @@ class TestDataAnalyzer:
         assert 'income' in data.columns
         assert 'spending_score' in data.columns
     
-    def test_customer_segmentation(self):
+    def test_customer_segmentation(self, sample_analyzer):
         """Test customer segmentation functionality."""
-        analyzer = DataAnalyzer()
-        data = analyzer.generate_sample_customer_data(50)
-        analyzer.customer_data = data
-        
-        segments = analyzer.perform_customer_segmentation(3)
+        segments = sample_analyzer.perform_customer_segmentation(3)
         
         assert 'data' in segments
         assert 'profiles' in segments
@@ -69,6 +82,411 @@ class TestDataAnalyzer:
         assert segments['n_clusters'] == 3
         assert len(segments['profiles']) == 3
 
+class TestDataProcessor:
+    """Test data processing module."""
+    
+    def test_insights_without_numeric_columns(self):
+        """Test insights on a frame holding only text columns."""
+        processor = DataProcessor()
+        processor.data = pd.DataFrame({'name': ['Ann', 'Bo', 'Ann'], 'city': ['Paris', 'Oslo', 'Rome']})
+        
+        stats = processor.generate_insights()['summary_stats']
+        
+        assert stats['name'] == {'count': 3, 'unique': 2, 'top': 'Ann', 'freq': 2}
+        assert stats['city']['unique'] == 3
+    
+    def test_export_segments_round_trip(self, tmp_path):
+        """Test exported segment files read back to the same data and dtypes."""
+        processor = DataProcessor()
+        processor.data = pd.DataFrame({
+            'customer_id': [1, 2, 3, 4],
+            'name': ['Ann', 'Bo', 'Cy', 'Di'],
+            'income': [0.0, 2000.0, 3500.5, 1200.0],
+            'segment': [0, 1, 0, 1]
+        })
+        
+        files = processor.export_segments(str(tmp_path))
+        
+        assert len(files) == 2
+        for segment_id, expected in processor.data.groupby('segment'):
+            path = tmp_path / f"segment_{segment_id}.csv"
+            pd.testing.assert_frame_equal(pd.read_csv(path), expected.reset_index(drop=True))
+            assert path.read_text() == expected.to_csv(index=False)
+
+class TestUtils:
+    """Test utility functions."""
+    
+    @pytest.mark.parametrize("content", ['{"a": NaN}', '{"a": Infinity}', '{"a": 123456789012345678901234567890}'])
+    def test_json_upload_accepts_python_json_literals(self, tmp_path, content):
+        """Test JSON uploads orjson rejects but the json module reads."""
+        path = tmp_path / "data.json"
+        path.write_text(content)
+        
+        result = validate_file_upload(str(path))
+        
+        assert result['valid'], result['errors']
+        assert result['file_info']['json_type'] == 'dict'
+    
+    def test_malformed_json_upload_rejected(self, tmp_path):
+        """Test malformed JSON uploads are still reported."""
+        path = tmp_path / "data.json"
+        path.write_text('{"a": ')
+        
+        result = validate_file_upload(str(path))
+        
+        assert not result['valid']
+        assert result['errors'][0].startswith("Unable to read JSON file")
+    
+    def test_campaign_roi_returns_independent_dicts(self):
+        """Test ROI results are plain dicts that callers can serialize and update."""
+        roi = calculate_campaign_roi(100.0, 50.0)
+        
+        assert json.loads(json.dumps(roi)) == {'roi_percentage': 100.0, 'roas': 200.0,
+                                               'profit': 50.0, 'profit_margin': 50.0}
+        roi['profit'] = 0
+        assert calculate_campaign_roi(100.0, 50.0)['profit'] == 50.0
+    
+    def test_campaign_roi_bulk_matches_scalar(self):
+        """Test bulk ROI rows equal calculate_campaign_roi, including zero and negative edge cases."""
+        rng = np.random.default_rng(0)
+        revenue = np.concatenate([[100.0, 0.0, 250.0, -40.0, -40.0, 0.0, 123.456],
+                                  rng.uniform(-1000, 5000, 500).round(2)])
+        spend = np.concatenate([[50.0, 0.0, 0.0, 10.0, 0.0, 10.0, 7.89],
+                                rng.uniform(0, 2000, 500).round(2)])
+        spend[100:150] = 0.0
+        
+        bulk = calculate_campaign_roi_bulk(revenue, spend)
+        
+        expected = [[calculate_campaign_roi(float(r), float(s))[column] for column in ROI_METRIC_COLUMNS]
+                    for r, s in zip(revenue, spend)]
+        np.testing.assert_array_equal(bulk, np.array(expected))
+    
+    @pytest.mark.parametrize("values", [
+        [5, 1500.0, 999, 1000, -3, 0.5, 12_345_678, 2.5e9],
+        [0, 7, 2000],
+        [3.0, 4500.5, 999.9],
+    ])
+    def test_format_number_array_matches_format_number(self, values):
+        """Test vectorized formatting against format_number element by element."""
+        assert list(format_number_array(values)) == [format_number(value) for value in values]
+    
+    @pytest.mark.parametrize("currency", ["USD", "EUR", "GBP", "JPY"])
+    def test_format_currency_series_matches_format_currency(self, currency):
+        """Test column currency formatting against format_currency value by value."""
+        amounts = pd.Series([1234.5, -0.004, 0.0, 1e9], index=[3, 1, 2, 0])
+        
+        formatted = format_currency_series(amounts, currency)
+        
+        assert list(formatted) == [format_currency(amount, currency) for amount in amounts]
+        assert formatted.index.equals(amounts.index)
+    
+    @pytest.mark.parametrize("theme", ["default", "modern", "corporate", "vibrant", "unknown"])
+    def test_rgb_palette_matches_color_palette(self, theme):
+        """Test the parsed RGB palette decodes the hex palette of the same theme."""
+        palette = get_rgb_palette(theme)
+        
+        assert palette.dtype == np.uint8 and not palette.flags.writeable
+        assert ['#%02x%02x%02x' % tuple(rgb) for rgb in palette] == [color.lower() for color in get_color_palette(theme)]
+    
+    @pytest.mark.parametrize("decimal_places", [0, 1, 2])
+    def test_format_percentage_series_matches_format_percentage(self, decimal_places):
+        """Test column percentage formatting against format_percentage value by value."""
+        values = pd.Series([1.25, 0.05, -3.14159, 99.95, 0.0, 2.675, np.nan], index=list('abcdefg'), name='rate')
+        
+        formatted = format_percentage_series(values, decimal_places)
+        
+        assert list(formatted) == [format_percentage(value, decimal_places) for value in values]
+        assert formatted.index.equals(values.index) and formatted.name == 'rate'
+    
+    def test_powerbi_export_csv_format(self, tmp_path):
+        """Test the Power BI CSV keeps float metrics as floats and quotes only where needed."""
+        metrics = {'engagement_rate': 2.0, 'click_through_rate': 0.5, 'conversion_rate': 1,
+                   'cost_per_acquisition': 3.25, 'return_on_ad_spend': 0.0}
+        data = {'campaigns': {
+            'c1': {'config': {'name': 'Summer, "bold"', 'product': 'Shoes'}, 'status': 'completed',
+                   'created_at': '2024-01-01', 'generated_images': [{}, {}],
+                   'performance_metrics': {'overall_metrics': metrics}},
+            'c2': {'config': {'name': 'Winter'}, 'status': 'created'},
+        }}
+        path = tmp_path / "powerbi.csv"
+        
+        export_to_powerbi_format(data, str(path))
+        
+        assert path.read_text().splitlines() == [
+            'campaign_id,campaign_name,product,status,created_at,images_generated,engagement_rate,'
+            'click_through_rate,conversion_rate,cost_per_acquisition,return_on_ad_spend',
+            'c1,"Summer, ""bold""",Shoes,completed,2024-01-01,2,2.0,0.5,1.0,3.25,0.0',
+            'c2,Winter,,created,,0,,,,,',
+        ]
+        assert pd.read_csv(path)['engagement_rate'].dtype == 'float64'
+    
+    def test_powerbi_export_without_campaigns_writes_header(self, tmp_path):
+        """Test an export with no campaigns still has the column header."""
+        path = tmp_path / "powerbi.csv"
+        
+        export_to_powerbi_format({'campaigns': {}}, str(path))
+        
+        assert path.read_text() == 'campaign_id,campaign_name,product,status,created_at,images_generated\n'
+
+class FakeAsyncImages:
+    """Async images endpoint returning one URL per requested image, optionally rate limiting first."""
+    
+    def __init__(self, rate_limited=0, delays=None):
+        self.calls = []
+        self.rate_limited = rate_limited
+        self.delays = delays or {}
+    
+    async def generate(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.rate_limited:
+            self.rate_limited -= 1
+            raise openai.RateLimitError("rate limited", response=Mock(status_code=429, headers={}), body=None)
+        if kwargs['prompt'] in self.delays:
+            await asyncio.sleep(self.delays[kwargs['prompt']])
+        call = len(self.calls)
+        return SimpleNamespace(data=[
+            SimpleNamespace(url=f"https://images.test/{kwargs['prompt']}/{call}/{i}", revised_prompt=kwargs['prompt'])
+            for i in range(kwargs['n'])
+        ])
+
+class FakeAsyncOpenAI:
+    """Stand-in for openai.AsyncOpenAI sharing one images endpoint."""
+    
+    def __init__(self, images):
+        self.images = images
+    
+    async def close(self):
+        pass
+
+@pytest.fixture
+def fake_images(monkeypatch):
+    """Async images endpoint installed as the client of every new AsyncOpenAI."""
+    images = FakeAsyncImages()
+    monkeypatch.setattr(openai, "AsyncOpenAI", lambda **kwargs: FakeAsyncOpenAI(images))
+    return images
+
+@pytest.fixture
+def image_generator():
+    """ImageGenerator whose downloads return the image URL as bytes."""
+    generator = ImageGenerator(api_key="test-key")
+    generator._download_image = lambda url: url.encode()
+    return generator
+
+class FakeImages:
+    """Sync images endpoint returning one numbered URL per call."""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def generate(self, **kwargs):
+        self.calls.append(kwargs['prompt'])
+        return SimpleNamespace(data=[SimpleNamespace(url=f"https://images.test/{len(self.calls)}",
+                                                     revised_prompt=kwargs['prompt'])])
+
+@pytest.fixture
+def cached_generator(tmp_path, monkeypatch):
+    """ImageGenerator caching at most two images under tmp_path, on a fake sync client."""
+    images = FakeImages()
+    monkeypatch.setattr(image_generator_module, "_get_openai_client", lambda api_key: SimpleNamespace(images=images))
+    generator = ImageGenerator(api_key="test-key", cache_dir=str(tmp_path), max_cache_entries=2)
+    generator._download_image = lambda url: url.encode()
+    generator.fake_images = images
+    return generator
+
+def _cache_path(generator, prompt, suffix):
+    """Cache file of a default-settings request for prompt"""
+    key = generator._cache_key(prompt, "1024x1024", "standard", "vivid", "dall-e-3")
+    return os.path.join(generator.cache_dir, f"{key}{suffix}")
+
+class TestImageCache:
+    """Test the opt-in generated image cache."""
+    
+    def test_cache_disabled_by_default(self, image_generator):
+        """Test generators only cache when given a directory."""
+        assert image_generator.cache_dir is None
+    
+    def test_cache_miss_then_hit(self, cached_generator):
+        """Test a repeated request is served from the cache without the expired URL."""
+        first = cached_generator.generate_image("a")
+        second = cached_generator.generate_image("a")
+        
+        assert cached_generator.fake_images.calls == ["a"]
+        assert 'cached' not in first and first['image_url'] == "https://images.test/1"
+        assert second['cached'] and second['image_url'] is None
+        assert second['image_data'] == first['image_data']
+    
+    def test_refresh_replaces_cached_image(self, cached_generator):
+        """Test refresh=True generates a new image and overwrites the cached copy."""
+        cached_generator.generate_image("a")
+        refreshed = cached_generator.generate_image("a", refresh=True)
+        
+        assert cached_generator.fake_images.calls == ["a", "a"]
+        assert refreshed['image_data'] == b"https://images.test/2"
+        assert cached_generator.generate_image("a")['image_data'] == b"https://images.test/2"
+    
+    def test_interrupted_write_is_not_a_hit(self, cached_generator, monkeypatch):
+        """Test the metadata is written last, so a write interrupted after the image misses."""
+        result = {'success': True, 'image_data': b"image", 'image_url': "https://images.test/1", 'prompt': "a"}
+        key = cached_generator._cache_key("a", "1024x1024", "standard", "vivid", "dall-e-3")
+        
+        def interrupted_dump(*args, **kwargs):
+            raise KeyboardInterrupt
+        
+        monkeypatch.setattr(image_generator_module.json, "dump", interrupted_dump)
+        with pytest.raises(KeyboardInterrupt):
+            cached_generator._store_cached_result(key, result)
+        
+        assert os.path.exists(_cache_path(cached_generator, "a", ".png"))
+        assert cached_generator._load_cached_result(key) is None
+    
+    def test_least_recently_used_entry_evicted(self, cached_generator):
+        """Test storing past max_cache_entries evicts the least recently used image."""
+        cached_generator.generate_image("a")
+        cached_generator.generate_image("b")
+        # Age both entries, then touch "a" with a hit so "b" is the least recently used
+        for prompt, mtime in (("a", 1000), ("b", 2000)):
+            os.utime(_cache_path(cached_generator, prompt, ".json"), (mtime, mtime))
+        cached_generator.generate_image("a")
+        
+        cached_generator.generate_image("c")
+        
+        assert not os.path.exists(_cache_path(cached_generator, "b", ".json"))
+        assert not os.path.exists(_cache_path(cached_generator, "b", ".png"))
+        assert len(os.listdir(cached_generator.cache_dir)) == 4
+        assert cached_generator.generate_image("a")['cached']
+        assert cached_generator.fake_images.calls == ["a", "b", "c"]
+
+class TestImageGenerator:
+    """Test image generation module."""
+    
+    def test_batch_results_follow_prompt_order(self, image_generator, fake_images):
+        """Test concurrent results come back in prompt order, not completion order."""
+        fake_images.delays = {'p0': 0.05, 'p1': 0.02}
+        prompts = ['p0', 'p1', 'p2', 'p3']
+        
+        results = image_generator.generate_batch_concurrent(prompts, max_concurrency=4)
+        
+        assert [result['prompt'] for result in results] == prompts
+        assert all(result['success'] for result in results)
+        assert [result['image_data'].split(b'/')[3] for result in results] == [b'p0', b'p1', b'p2', b'p3']
+    
+    def test_batch_progress_counts(self, image_generator, fake_images):
+        """Test progress is reported once per request, ending at the prompt total."""
+        progress = []
+        
+        image_generator.generate_batch_concurrent([f'p{i}' for i in range(5)], max_concurrency=2,
+                                                  progress_callback=lambda done, total: progress.append((done, total)))
+        
+        assert progress == [(done, 5) for done in range(1, 6)]
+    
+    def test_rate_limited_request_retried_with_backoff(self, image_generator, fake_images, monkeypatch):
+        """Test rate limited requests retry after exponentially growing sleeps."""
+        sleeps = []
+        
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+        
+        monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+        fake_images.rate_limited = 2
+        
+        result, = image_generator.generate_batch_concurrent(['p0'])
+        
+        assert result['success']
+        assert len(fake_images.calls) == 3
+        assert sleeps == [1, 2]
+    
+    def test_rate_limit_retries_exhausted(self, image_generator, fake_images, monkeypatch):
+        """Test a request still rate limited after every retry returns an error result."""
+        async def fake_sleep(seconds):
+            pass
+        
+        monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+        fake_images.rate_limited = 10
+        
+        result, = image_generator.generate_batch_concurrent(['p0'])
+        
+        assert not result['success']
+        assert len(fake_images.calls) == 4
+    
+    def test_request_pacer_spaces_out_starts(self):
+        """Test the pacer starts concurrent requests at least one interval apart."""
+        async def run():
+            pacer = _RequestPacer(0.05)
+            loop = asyncio.get_running_loop()
+            starts = []
+            
+            async def request():
+                await pacer.wait()
+                starts.append(loop.time())
+            
+            await asyncio.gather(*(request() for _ in range(3)))
+            return starts
+        
+        starts = asyncio.run(run())
+        
+        assert all(later - earlier >= 0.045 for earlier, later in zip(starts, starts[1:]))
+    
+    def test_run_coroutine_inside_running_loop(self):
+        """Test coroutines run on a worker thread when the caller already runs an event loop."""
+        async def thread_id():
+            return threading.get_ident()
+        
+        async def caller():
+            return _run_coroutine(thread_id())
+        
+        assert _run_coroutine(thread_id()) == threading.get_ident()
+        assert asyncio.run(caller()) != threading.get_ident()
+    
+    def test_batch_inside_running_loop(self, image_generator, fake_images):
+        """Test batch generation works when called from a running event loop (e.g. Jupyter)."""
+        async def caller():
+            return image_generator.generate_batch(['p0', 'p1'], delay=0)
+        
+        results = asyncio.run(caller())
+        
+        assert [result['prompt'] for result in results] == ['p0', 'p1']
+        assert all(result['success'] for result in results)
+    
+    def test_dalle2_repeated_prompts_share_requests(self, image_generator, fake_images):
+        """Test dall-e-2 coalesces repeated prompts into requests of at most 10 images."""
+        prompts = ['a', 'b'] * 6 + ['a'] * 6
+        
+        results = image_generator.generate_batch_concurrent(prompts, model="dall-e-2")
+        
+        assert sorted((call['prompt'], call['n']) for call in fake_images.calls) == [('a', 2), ('a', 10), ('b', 6)]
+        assert [result['prompt'] for result in results] == prompts
+        # Every occurrence gets its own image, in the order the request returned them
+        images = [result['image_data'] for result in results]
+        assert len(set(images)) == len(prompts)
+        a_indices = [image.decode().rsplit('/', 1)[1] for image, prompt in zip(images, prompts) if prompt == 'a']
+        assert a_indices == [str(i) for i in range(10)] + ['0', '1']
+    
+    def test_dalle3_repeated_prompts_sent_separately(self, image_generator, fake_images):
+        """Test models returning one image per request send every repeated prompt on its own."""
+        results = image_generator.generate_batch_concurrent(['a', 'a', 'a'])
+        
+        assert [call['n'] for call in fake_images.calls] == [1, 1, 1]
+        assert len({result['image_data'] for result in results}) == 3
+    
+    def test_generators_share_download_threads(self):
+        """Test downloads run on one shared executor rather than one per generator."""
+        with patch.object(image_generator_module, 'ThreadPoolExecutor') as executor_class:
+            ImageGenerator(api_key="test-key")
+            ImageGenerator(api_key="test-key")
+        
+        executor_class.assert_not_called()
+        assert image_generator_module._get_download_executor() is image_generator_module._get_download_executor()
+    
+    def test_close_releases_download_session(self):
+        """Test close(), also run on leaving a with block, closes the keep-alive session."""
+        session = Mock()
+        with ImageGenerator(api_key="test-key") as generator:
+            generator._session = session
+        
+        session.close.assert_called_once()
+        assert generator._session is None
+        generator.close()
+
 if __name__ == "__main__":
     # Simple test runner
     print("Running BrandGen Tests...")